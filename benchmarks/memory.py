@@ -0,0 +1,116 @@
+from . import synthetic
+import argparse
+import font
+import json
+import sys
+import tracemalloc
+
+# (fvar instances, records in each record-based table) of the synthetic fonts
+SIZES = {"small": (16, 8), "medium": (256, 64), "large": (4096, 512)}
+
+
+def measure_retained(data, count):
+    """Return the memory and allocations kept alive by each parsed font.
+
+    `count` fonts are parsed from `data` and kept; the data itself is
+    allocated beforehand, so only the objects the parser builds are counted.
+    """
+    tracemalloc.start()
+    try:
+        fonts = [font.OTF.from_bytes(data) for _ in range(count)]
+        snapshot = tracemalloc.take_snapshot()
+
+    finally:
+        tracemalloc.stop()
+
+    stats = snapshot.statistics("filename")
+    size = sum(stat.size for stat in stats)
+    blocks = sum(stat.count for stat in stats)
+    del fonts
+    return {"bytes": size // count, "blocks": blocks // count, "fonts": count}
+
+
+def measure_tables(data, count):
+    """Return the memory kept alive by each parsed table, keyed by tag."""
+    otf_f = font.OTF.from_bytes(data)
+    results = {}
+    for table in otf_f.tables:
+        raw = bytes(table.to_bytes())
+        results[table.tag] = measure_table(table.tag, raw, count)
+
+    return results
+
+
+def measure_table(tag, data, count):
+    tracemalloc.start()
+    try:
+        tables = [font.tables.new_table(tag, data, None) for _ in range(count)]
+        current, _ = tracemalloc.get_traced_memory()
+
+    finally:
+        tracemalloc.stop()
+
+    del tables
+    return current // count
+
+
+def run(sizes, count):
+    """Measure the retained memory of parsed fonts of each size."""
+    results = {}
+    for size in sizes:
+        instances, records = SIZES[size]
+        data = synthetic.make_font(4096, instances=instances, records=records)
+        result = measure_retained(data, count)
+        result["tables"] = measure_tables(data, count)
+        results[size] = result
+        print(
+            "{:<8} {:>10,} B {:>8,} blocks per font".format(
+                size, result["bytes"], result["blocks"]
+            ),
+            file=sys.stderr,
+        )
+        for tag, size in sorted(
+            result["tables"].items(), key=lambda item: item[1], reverse=True
+        ):
+            print("    {:<4} {:>10,} B".format(tag, size), file=sys.stderr)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.memory",
+        description="Measure the memory kept alive by parsed synthetic fonts.",
+    )
+    parser.add_argument(
+        "--sizes",
+        default="small,medium",
+        help="comma separated font sizes out of: {} (default: %(default)s)".format(
+            ", ".join(SIZES)
+        ),
+    )
+    parser.add_argument(
+        "--count", type=int, default=20, help="fonts kept alive at once"
+    )
+    parser.add_argument(
+        "-o", "--output", help="file to write the results to, instead of stdout"
+    )
+    args = parser.parse_args(argv)
+    sizes = args.sizes.split(",")
+    for size in sizes:
+        if size not in SIZES:
+            parser.error("unknown size: {}".format(size))
+
+    results = json.dumps(run(sizes, args.count), indent=2)
+    if args.output is None:
+        print(results)
+
+    else:
+        with open(args.output, "w") as fp:
+            fp.write(results + "\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+from . import synthetic
+import argparse
+import font
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+# (glyf size, extra tables, fvar instances) of the synthetic fonts
+SIZES = {
+    "small": (64 * 2 ** 10, 4, 16),
+    "medium": (2 ** 20, 16, 256),
+    "large": (8 * 2 ** 20, 64, 4096),
+}
+
+# fonts in the synthetic collections
+COLLECTION_FONTS = 4
+
+
+def make_cases(size):
+    """Return a dict of benchmark functions for fonts of the given size.
+
+    Each function is called without arguments; its data is generated here so
+    generation is not part of the timings.
+    """
+    glyf_size, extra_tables, instances = SIZES[size]
+    otf_data = synthetic.make_font(glyf_size, extra_tables=extra_tables)
+    fvar_data = synthetic.make_font(4096, instances=instances)
+    ttc_data = synthetic.make_collection(COLLECTION_FONTS, glyf_size)
+    otf_f = font.OTF.from_bytes(otf_data)
+    woff_data = otf_f.to_woff().to_bytes()
+    woff_f = font.WOFF.from_bytes(woff_data)
+    ttc_f = font.TTC.from_bytes(ttc_data)
+    glyf = otf_f["glyf"].to_bytes()
+
+    def pack_tables(file):
+        # unmodified tables write their original data, so pack them directly
+        return [table.pack() for table in file.tables]
+
+    return {
+        "otf.from_bytes": lambda: font.OTF.from_bytes(otf_data),
+        "otf.to_bytes": lambda: otf_f.to_bytes(),
+        "otf.pack_tables": lambda: pack_tables(otf_f),
+        "otf.to_woff": lambda: otf_f.to_woff().to_bytes(),
+        "woff.from_bytes": lambda: font.WOFF.from_bytes(woff_data),
+        "woff.to_otf": lambda: woff_f.to_otf().to_bytes(),
+        "transcode woff->otf": lambda: font.transcode(
+            io.BytesIO(woff_data), io.BytesIO(), "woff", "otf"
+        ),
+        "fvar.from_bytes": lambda: font.OTF.from_bytes(fvar_data)["fvar"],
+        "ttc.from_bytes": lambda: font.TTC.from_bytes(ttc_data),
+        "ttc.round_trip": lambda: font.TTC.from_bytes(ttc_f.to_bytes()),
+        "utils.calc_checksum": lambda: font.utils.calc_checksum(glyf),
+    }
+
+
+def measure(func, repeat):
+    """Time `func` and record the peak memory it allocates.
+
+    Memory is traced in a separate call, since tracing slows the timed ones.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "time": statistics.median(times),
+        "min_time": min(times),
+        "peak_memory": peak,
+        "repeat": repeat,
+    }
+
+
+def run(sizes, repeat, pattern=None):
+    """Run the benchmarks for each size, returning a JSON-serializable dict."""
+    results = {}
+    for size in sizes:
+        for name, func in make_cases(size).items():
+            key = "{} [{}]".format(name, size)
+            if pattern is not None and pattern not in key:
+                continue
+
+            results[key] = measure(func, repeat)
+            print(
+                "{:<40} {:>10.3f} ms {:>12,} B peak".format(
+                    key, results[key]["time"] * 1000, results[key]["peak_memory"]
+                ),
+                file=sys.stderr,
+            )
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.time(),
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Compare two result sets, returning the names of regressed benchmarks.
+
+    A benchmark regresses if its time or peak memory grew by more than
+    `threshold`, as a fraction of the baseline.
+    """
+    regressions = []
+    for name, result in sorted(current["results"].items()):
+        base = baseline["results"].get(name)
+        if base is None:
+            print("{:<40} new".format(name))
+            continue
+
+        time_ratio = result["time"] / base["time"] if base["time"] else 1.0
+        memory_ratio = (
+            result["peak_memory"] / base["peak_memory"] if base["peak_memory"] else 1.0
+        )
+        regressed = time_ratio > 1 + threshold or memory_ratio > 1 + threshold
+        print(
+            "{:<40} time {:>7.1%} memory {:>7.1%}{}".format(
+                name,
+                time_ratio - 1,
+                memory_ratio - 1,
+                "  REGRESSION" if regressed else "",
+            )
+        )
+        if regressed:
+            regressions.append(name)
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Benchmark parsing and encoding synthetic fonts.",
+    )
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument(
+        "--sizes",
+        default="small,medium",
+        help="comma separated font sizes out of: {} (default: %(default)s)".format(
+            ", ".join(SIZES)
+        ),
+    )
+    run_parser.add_argument(
+        "--repeat", type=int, default=5, help="timed calls per benchmark"
+    )
+    run_parser.add_argument(
+        "-k", dest="pattern", help="only run benchmarks whose name contains this"
+    )
+    run_parser.add_argument(
+        "-o", "--output", help="file to write the results to, instead of stdout"
+    )
+
+    compare_parser = commands.add_parser(
+        "compare", help="compare results, failing on regressions"
+    )
+    compare_parser.add_argument("baseline", help="results to compare against")
+    compare_parser.add_argument("current", help="results to check")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="allowed growth in time or memory (default: %(default)s)",
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        sizes = args.sizes.split(",")
+        for size in sizes:
+            if size not in SIZES:
+                parser.error("unknown size: {}".format(size))
+
+        results = json.dumps(run(sizes, args.repeat, args.pattern), indent=2)
+        if args.output is None:
+            print(results)
+
+        else:
+            with open(args.output, "w") as fp:
+                fp.write(results + "\n")
+
+        return 0
+
+    with open(args.baseline) as fp:
+        baseline = json.load(fp)
+
+    with open(args.current) as fp:
+        current = json.load(fp)
+
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print("{} regressions above {:.0%}".format(len(regressions), args.threshold))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
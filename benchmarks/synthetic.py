@@ -0,0 +1,163 @@
+from font.tables import avar, EBSC, fvar, gasp, head, hhea, maxp, meta
+import font
+import random
+import struct
+
+# tables every font needs, filled with placeholder data unless generated below
+PLACEHOLDER_SIZES = {"OS/2": 96, "cmap": 1024, "name": 2048, "post": 32}
+
+
+def make_blob(size, seed):
+    """Return `size` bytes that compress about as well as real glyph data.
+
+    Half of each block is random and half repeats, so zlib has work to do
+    without the data being incompressible.
+    """
+    rng = random.Random(seed)
+    block = bytes(rng.getrandbits(8) for _ in range(256)) + bytes(range(256))
+    data = bytearray()
+    while len(data) < size:
+        data += block
+        block = block[1:] + block[:1]
+
+    return bytes(data[:size])
+
+
+def make_fvar(axis_count, instance_count):
+    """Return fvar table data with the given numbers of axes and instances."""
+    instance_size = 6 + 4 * axis_count
+    data = [
+        fvar.fvar_h_s.pack(1, 0, 16, 2, axis_count, 20, instance_count, instance_size)
+    ]
+    for i in range(axis_count):
+        tag = font.utils.str2tag("ax{:02d}".format(i))
+        data.append(
+            fvar.fvar_variation_axis_record_s.pack(
+                tag, 100 << 16, 400 << 16, 900 << 16, 0, 256 + i
+            )
+        )
+
+    for i in range(instance_count):
+        data.append(fvar.fvar_instance_record_p0_s.pack(300 + i, 0))
+        data.append(struct.pack(">{}I".format(axis_count), *[400 << 16] * axis_count))
+        data.append(fvar.fvar_instance_record_op_s.pack(300 + i))
+
+    return b"".join(data)
+
+
+def make_avar(axis_count, map_count):
+    """Return avar table data mapping `map_count` coordinates of each axis."""
+    data = [avar.avar_h_s.pack(1, 0, 0, axis_count)]
+    for _ in range(axis_count):
+        data.append(avar.avar_segment_maps_s.pack(map_count))
+        for i in range(map_count):
+            coordinate = (2 * i * 2 ** 14) // max(map_count - 1, 1) - 2 ** 14
+            data.append(avar.avar_axis_value_map_s.pack(coordinate, coordinate // 2))
+
+    return b"".join(data)
+
+
+def make_ebsc(size_count):
+    """Return EBSC table data with `size_count` bitmap scales."""
+    data = [EBSC.ebsc_h_s.pack(2, 0, size_count)]
+    for i in range(size_count):
+        data.append(bytes(24))
+        data.append(EBSC.ebsc_bitmap_scale_s.pack(8 + i % 64, 8 + i % 64, 12, 12))
+
+    return b"".join(data)
+
+
+def make_gasp(range_count):
+    """Return gasp table data with `range_count` ranges."""
+    return gasp.gasp_s.pack(1, range_count) + b"".join(
+        gasp.gasp_s.pack(8 * (i + 1), 0x000F) for i in range(range_count)
+    )
+
+
+def make_meta(map_count):
+    """Return meta table data with `map_count` data maps."""
+    data = [("dlng" if i % 2 else "appl", b"Latn" * 4) for i in range(map_count)]
+    header = [meta.meta_h_s.pack(1, 0, 0, map_count)]
+    offset = meta.meta_h_s.size + meta.meta_data_map_s.size * map_count
+    for tag, value in data:
+        header.append(
+            meta.meta_data_map_s.pack(font.utils.str2tag(tag), offset, len(value))
+        )
+        offset += len(value)
+
+    return b"".join(header) + b"".join(value for _, value in data)
+
+
+def make_tables(
+    glyf_size, num_glyphs=1000, extra_tables=0, instances=0, records=0, seed=0
+):
+    """Return a dict of raw table data, keyed by tag."""
+    data = {
+        "head": head.head_s.pack(
+            1, 0, 0x10000, 0, 0x5F0F3CF5, 0, 1000, 0, 0, 0, 0, 1000, 1000, 0, 8, 2, 1, 0
+        ),
+        "hhea": hhea.hhea_s.pack(
+            1, 0, 800, -200, 0, 1000, 0, 0, 1000, 1, 0, 0, 0, 0, 0, 0, 0, num_glyphs
+        ),
+        "maxp": maxp.maxp_v0_5_s.pack(0x10000, num_glyphs) + bytes(26),
+        "hmtx": make_blob(num_glyphs * 4, seed + 1),
+        "glyf": make_blob(glyf_size, seed),
+        "loca": struct.pack(
+            ">{}I".format(num_glyphs + 1),
+            *[glyf_size * i // num_glyphs for i in range(num_glyphs + 1)],
+        ),
+    }
+    for i, (tag, size) in enumerate(PLACEHOLDER_SIZES.items()):
+        data[tag] = make_blob(size, seed + 2 + i)
+
+    for i in range(extra_tables):
+        data["X{:03d}".format(i)] = make_blob(1024 + 64 * i, seed + 100 + i)
+
+    if instances:
+        data["fvar"] = make_fvar(4, instances)
+
+    if records:
+        data["avar"] = make_avar(4, records)
+        data["EBSC"] = make_ebsc(records)
+        data["gasp"] = make_gasp(records)
+        data["meta"] = make_meta(records)
+        data["cvt "] = make_blob(2 * records, seed + 3)
+        data["LTSH"] = struct.pack(">2H", 0, num_glyphs) + make_blob(num_glyphs, seed)
+
+    return data
+
+
+def make_otf(tables):
+    """Return an OTF file object with the given raw table data."""
+    otf_f = font.OTF()
+    otf_f.sfnt_version = 0x00010000
+    otf_f.tables = [
+        font.tables.new_table(tag, data, otf_f) for tag, data in tables.items()
+    ]
+    return otf_f
+
+
+def make_font(
+    glyf_size, num_glyphs=1000, extra_tables=0, instances=0, records=0, seed=0
+):
+    """Return the data of a synthetic OTF font."""
+    tables = make_tables(glyf_size, num_glyphs, extra_tables, instances, records, seed)
+    return make_otf(tables).to_bytes()
+
+
+def make_collection(num_fonts, glyf_size, shared=("glyf", "loca", "hmtx"), seed=0):
+    """Return the data of a synthetic TTC whose fonts share some tables.
+
+    The tables named in `shared` are identical in every font; the others
+    differ from font to font.
+    """
+    common = make_tables(glyf_size, seed=seed)
+    fonts = []
+    for i in range(num_fonts):
+        tables = make_tables(glyf_size, seed=seed + 1000 * (i + 1))
+        tables.update({tag: common[tag] for tag in shared})
+        fonts.append(make_otf(tables))
+
+    ttc_f = font.TTC()
+    ttc_f.fonts = fonts
+    return ttc_f.to_bytes()
@@ -1,3 +1,7 @@
+from . import aio, batch, cache, index, instrument
 from .otf import File as OTF
 from .ttc import File as TTC
 from .woff import File as WOFF
+from .woff2 import File as WOFF2
+from .transcoder import transcode
+from .scanner import scan
@@ -0,0 +1,127 @@
+from . import batch, cache, index, woff
+import argparse
+import os
+import sys
+
+
+def convert(args):
+    """Run the convert command, returning the exit status."""
+    summary = batch.Summary()
+    conversion_cache = None
+    if args.cache is not None:
+        conversion_cache = cache.Cache(args.cache, args.cache_size * 2 ** 20)
+
+    for result in batch.convert(
+        args.sources,
+        args.dest,
+        args.to,
+        args.jobs,
+        args.profile,
+        args.force,
+        conversion_cache,
+    ):
+        summary.add(result)
+        if result.error is not None:
+            print("failed {}: {}".format(result.src, result.error), file=sys.stderr)
+
+        elif not result.skipped:
+            print(
+                "{} -> {} ({} -> {} bytes)".format(
+                    result.src, result.dst, result.src_size, result.dst_size
+                ),
+                flush=True,
+            )
+
+    print(summary)
+    return 1 if summary.failed else 0
+
+
+def update_index(args):
+    """Run the index command, returning the exit status."""
+    with index.Index(args.database) as font_index:
+        summary = font_index.update(args.sources, args.jobs, not args.no_hash)
+        # list every file that cannot be read whenever one failed in this run
+        for path, error in font_index.errors() if summary.failed else ():
+            print("failed {}: {}".format(path, error), file=sys.stderr)
+
+    print(
+        "{} scanned, {} unchanged, {} removed, {} failed".format(
+            summary.scanned, summary.unchanged, summary.removed, summary.failed
+        )
+    )
+    return 1 if summary.failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m font",
+        description="Utilities for converting between different font formats.",
+    )
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    convert_parser = commands.add_parser(
+        "convert", help="convert fonts, or directories of fonts, to another format"
+    )
+    convert_parser.set_defaults(run=convert)
+    convert_parser.add_argument(
+        "--to", required=True, choices=sorted(batch.FORMATS), help="output format"
+    )
+    convert_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of processes to convert fonts with (default: %(default)s)",
+    )
+    convert_parser.add_argument(
+        "--profile",
+        choices=sorted(woff.PROFILES),
+        default="default",
+        help="WOFF compression profile (default: %(default)s)",
+    )
+    convert_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="convert fonts even if their output is up to date",
+    )
+    convert_parser.add_argument(
+        "--cache", metavar="DIR", help="directory to cache converted fonts in"
+    )
+    convert_parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=1024,
+        metavar="MB",
+        help="size the cache is kept within (default: %(default)s)",
+    )
+    convert_parser.add_argument(
+        "sources", nargs="+", metavar="SRC", help="font file or directory"
+    )
+    convert_parser.add_argument("dest", metavar="DEST", help="output directory")
+
+    index_parser = commands.add_parser(
+        "index", help="update an index of fonts, or directories of fonts"
+    )
+    index_parser.set_defaults(run=update_index)
+    index_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of processes to scan fonts with (default: %(default)s)",
+    )
+    index_parser.add_argument(
+        "--no-hash", action="store_true", help="do not hash the contents of files and their tables"
+    )
+    index_parser.add_argument("database", metavar="DB", help="SQLite index file")
+    index_parser.add_argument(
+        "sources", nargs="+", metavar="SRC", help="font file or directory"
+    )
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+from . import batch, otf, ttc, woff, woff2
+import asyncio
+import functools
+
+# bytes yielded at a time by encode_stream
+CHUNK_SIZE = 2 ** 16
+
+
+class Runner(object):
+    """Run blocking font work off the event loop.
+
+    Work is run on `executor`, or the loop's default executor if None, and at
+    most `limit` pieces of work run at once; the rest wait their turn without
+    occupying the executor, so a burst of large fonts cannot take every thread.
+    """
+
+    __slots__ = ["executor", "limit", "_loop", "_semaphore"]
+
+    def __init__(self, executor=None, limit=4):
+        self.executor = executor
+        self.limit = limit
+        self._loop = None
+        self._semaphore = None
+
+    def semaphore(self):
+        """Return the semaphore limiting work on the running loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.limit)
+
+        return self._semaphore
+
+    async def run(self, func, *args, **kwargs):
+        """Call `func` on the executor and return its result."""
+        async with self.semaphore():
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, functools.partial(func, *args, **kwargs)
+            )
+
+
+# used when no runner is given
+default_runner = Runner()
+
+
+async def read_exactly(reader, n):
+    """Read exactly `n` bytes from a stream reader."""
+    if hasattr(reader, "readexactly"):
+        return await reader.readexactly(n)
+
+    data = b""
+    while len(data) < n:
+        chunk = await reader.read(n - len(data))
+        if not chunk:
+            raise EOFError(
+                "Invalid file; expected {} more bytes, received end of file".format(
+                    n - len(data)
+                )
+            )
+
+        data += chunk
+
+    return data
+
+
+async def read_font_data(reader):
+    """Read the data of one font file from a stream reader.
+
+    Only as much is read as the file's header and table directory say it
+    covers. Returns the data and its format, as given by `batch.detect_format`.
+    """
+    data = await read_exactly(reader, 12)
+    format, _ = batch.detect_format(data[:8])
+    if format in ("woff", "woff2"):
+        # the total length of the file is in the header
+        length = int.from_bytes(data[8:12], "big")
+
+    elif format == "otf":
+        num_tables = int.from_bytes(data[4:6], "big")
+        data += await read_exactly(reader, num_tables * otf.TABLE_SIZE)
+        length = len(data)
+        for _, _, offset, table_length in otf.table_s.iter_unpack(data[12:]):
+            length = max(length, offset + table_length)
+
+    else:
+        # fonts in collections may be anywhere in the file
+        return data + await reader.read(-1), format
+
+    return data + await read_exactly(reader, length - len(data)), format
+
+
+async def load(reader, runner=None):
+    """Read a font from a stream reader, such as an `asyncio.StreamReader`.
+
+    The data is read with awaited reads and parsed, along with any
+    decompression, on the runner's executor. Returns an OTF, TTC, WOFF or WOFF2
+    file object depending on the format of the data.
+    """
+    runner = default_runner if runner is None else runner
+    data, format = await read_font_data(reader)
+    cls = {"otf": otf.File, "ttc": ttc.File, "woff": woff.File, "woff2": woff2.File}
+    return await runner.run(cls[format].from_bytes, data)
+
+
+def to_woff(file):
+    """Return a WOFF file object for an OTF or WOFF file object."""
+    return file if isinstance(file, woff.File) else file.to_woff()
+
+
+async def encode_async(file, profile="default", runner=None):
+    """Encode an OTF or WOFF file object as WOFF data.
+
+    Packing, checksums and compression run on the runner's executor.
+    """
+    runner = default_runner if runner is None else runner
+    return await runner.run(to_woff(file).to_bytes, profile=profile)
+
+
+async def encode_stream(file, profile="default", runner=None, chunk_size=CHUNK_SIZE):
+    """Encode an OTF or WOFF file object as WOFF data, yielding it in chunks.
+
+    Equivalent to `encode_async` followed by slicing the result: every table
+    has to be compressed before the directory can be written, so the font is
+    encoded in full first. The runner's slot and thread are released before
+    the first chunk is yielded, however slowly the chunks are consumed.
+    """
+    data = memoryview(await encode_async(file, profile, runner))
+    for start in range(0, len(data), chunk_size):
+        yield data[start : start + chunk_size]
@@ -0,0 +1,332 @@
+from . import otf, transcoder, ttc, woff, woff2
+import collections
+import concurrent.futures
+import io
+import os
+import time
+
+# output file extension for each format fonts can be converted to
+FORMATS = {"otf": ".otf", "ttc": ".ttc", "woff": ".woff", "woff2": ".woff2"}
+
+# file extensions of fonts found when searching directories
+EXTENSIONS = {".otf", ".ttc", ".ttf", ".woff", ".woff2"}
+
+SIGNATURES = {
+    b"OTTO": "otf",
+    b"\0\1\0\0": "otf",
+    b"true": "otf",
+    b"ttcf": "ttc",
+    b"wOFF": "woff",
+    b"wOF2": "woff2",
+}
+
+Result = collections.namedtuple(
+    "Result",
+    ["src", "dst", "src_size", "dst_size", "skipped", "error", "cached", "cache_key"],
+)
+
+
+def check_format(to):
+    """Raise an exception if fonts cannot be converted to the format `to`."""
+    if to not in FORMATS:
+        raise Exception(
+            "Invalid font format; expected one of: {}, received: '{}'".format(
+                ", ".join("'{}'".format(name) for name in FORMATS), to
+            )
+        )
+
+
+def check_conversion(src_format, collection, to):
+    """Raise an exception if a font cannot be converted to the format `to`."""
+    check_format(to)
+    if to != "woff2" and collection != (to == "ttc"):
+        # collections only convert to collections, and single fonts to fonts
+        raise Exception(
+            "Invalid conversion; {} {} cannot be converted to {}".format(
+                src_format, "collections" if collection else "fonts", to
+            )
+        )
+
+
+def detect_format(header):
+    """Return the format of a font file from its first eight bytes.
+
+    Returns the format and whether the file is a collection of fonts.
+    """
+    format = SIGNATURES.get(bytes(header[:4]))
+    if format is None:
+        raise Exception(
+            "Invalid file signature; expected one of: {}, received: {}".format(
+                ", ".join(repr(signature) for signature in SIGNATURES), header[:4]
+            )
+        )
+
+    return format, format == "ttc" or format == "woff2" and header[4:8] == b"ttcf"
+
+
+def find_jobs(sources, dest, to):
+    """Yield the (source, destination) paths of each font to convert.
+
+    Directories in `sources` are searched recursively and their structure is
+    recreated under `dest`; files are converted straight into `dest`.
+    """
+    for source in sources:
+        if not os.path.isdir(source):
+            yield source, output_path(os.path.join(dest, os.path.basename(source)), to)
+            continue
+
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in EXTENSIONS:
+                    src = os.path.join(root, name)
+                    dst = os.path.join(dest, os.path.relpath(src, source))
+                    yield src, output_path(dst, to)
+
+
+def output_path(path, to):
+    """Replace the extension of `path` with the one for the format `to`."""
+    return os.path.splitext(path)[0] + FORMATS[to]
+
+
+def is_up_to_date(src, dst):
+    """Whether `dst` was converted from the current version of `src`.
+
+    Converted files are given the modification time of their source, so an
+    output is up to date if it is not empty and its time matches the source.
+    """
+    try:
+        dst_stat = os.stat(dst)
+
+    except FileNotFoundError:
+        return False
+
+    return dst_stat.st_size > 0 and dst_stat.st_mtime_ns == os.stat(src).st_mtime_ns
+
+
+def convert_bytes(data, to, profile="default"):
+    """Convert the font in `data` to the format `to`, returning its data."""
+    src_format, collection = detect_format(data[:8])
+    check_conversion(src_format, collection, to)
+    fp = io.BytesIO()
+    write_converted(io.BytesIO(data), fp, src_format, to, profile)
+    return fp.getvalue()
+
+
+def convert_file(src, dst, to, profile="default", cache=None):
+    """Convert the font at `src` to the format `to`, writing it to `dst`.
+
+    OTF and WOFF fonts are converted with `transcoder.transcode` without
+    parsing their tables. The output is written to a temporary file that
+    replaces `dst` once complete, and is given the modification time of `src`.
+
+    If a `cache.Cache` is given the converted data is looked up in, or added
+    to, it. Returns whether the data was found in the cache and the key of its
+    entry, which is None without a cache.
+    """
+    cached = False
+    key = None
+    with open(src, "rb") as src_fp:
+        src_format, collection = detect_format(src_fp.read(8))
+        check_conversion(src_format, collection, to)
+        src_fp.seek(0)
+
+        directory = os.path.dirname(dst)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp = "{}.{}.tmp".format(dst, os.getpid())
+        try:
+            with open(temp, "wb") as dst_fp:
+                if cache is None:
+                    write_converted(src_fp, dst_fp, src_format, to, profile)
+
+                else:
+                    data = src_fp.read()
+                    key = cache.key(data, to=to, profile=profile)
+                    converted = cache.get(key)
+                    cached = converted is not None
+                    if not cached:
+                        converted = convert_bytes(data, to, profile)
+                        cache.put(key, converted)
+
+                    dst_fp.write(converted)
+
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+
+            raise
+
+    src_stat = os.stat(src)
+    os.utime(temp, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+    os.replace(temp, dst)
+    return cached, key
+
+
+def write_converted(src_fp, dst_fp, src_format, to, profile="default"):
+    """Convert the font in `src_fp` to the format `to`, writing it to `dst_fp`."""
+    if src_format in transcoder.FORMATS and to in transcoder.FORMATS:
+        transcoder.transcode(src_fp, dst_fp, src_format, to, profile)
+        return
+
+    if src_format == "otf":
+        font = otf.File.from_file(src_fp, lazy=True)
+
+    elif src_format == "ttc":
+        font = ttc.File.from_file(src_fp, lazy=True)
+
+    elif src_format == "woff":
+        font = woff.File.from_file(src_fp).to_otf()
+
+    else:
+        font = woff2.File.from_file(src_fp)
+        if to == "woff2":
+            font.to_file(dst_fp)
+            return
+
+        font = font.to_ttc() if font.is_collection else font.to_otf()
+
+    if to == "woff2":
+        font.to_woff2().to_file(dst_fp)
+
+    elif to == "woff":
+        font.to_woff().to_file(dst_fp, profile=profile)
+
+    else:
+        font.to_file(dst_fp)
+
+
+def run_job(src, dst, to, profile="default", cache=None):
+    """Convert one font, returning a `Result` instead of raising on failure."""
+    src_size = os.path.getsize(src) if os.path.exists(src) else 0
+    try:
+        cached, key = convert_file(src, dst, to, profile, cache)
+
+    except Exception as e:
+        error = "{}: {}".format(type(e).__name__, e)
+        return Result(src, dst, src_size, 0, False, error, False, None)
+
+    dst_size = os.path.getsize(dst)
+    return Result(src, dst, src_size, dst_size, False, None, cached, key)
+
+
+def convert(sources, dest, to, jobs=None, profile="default", force=False, cache=None):
+    """Convert every font in `sources` to the format `to` under `dest`.
+
+    Fonts are converted on a pool of `jobs` processes, or in this process if
+    `jobs` is 1, and a `Result` is yielded for each as soon as it finishes.
+    Fonts whose output is up to date are skipped unless `force` is set, and
+    fonts that fail to convert are reported in their result's `error`.
+
+    Converted data is looked up in, and added to, `cache` if one is given.
+    Worker processes never evict entries themselves; the cache's size and
+    hit counts are kept up to date here from the results instead.
+    """
+    check_format(to)
+    worker_cache = None if cache is None else cache.worker()
+    for result in convert_all(sources, dest, to, jobs, profile, force, worker_cache):
+        if cache is not None and not result.skipped and result.error is None:
+            if result.cached:
+                cache.hits += 1
+                cache.touch(result.cache_key)
+
+            else:
+                cache.misses += 1
+                cache.track(result.cache_key, result.dst_size)
+
+        yield result
+
+
+def convert_all(sources, dest, to, jobs, profile, force, cache):
+    """Yield the `Result` of converting each font, as for `convert`."""
+    if jobs == 1:
+        for src, dst in find_jobs(sources, dest, to):
+            if not force and is_up_to_date(src, dst):
+                yield skipped(src, dst)
+
+            else:
+                yield run_job(src, dst, to, profile, cache)
+
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        # only a few fonts per process are queued at once, so results are
+        # reported while the rest are still being found
+        limit = 4 * (jobs or os.cpu_count() or 1)
+        futures = set()
+        for src, dst in find_jobs(sources, dest, to):
+            if not force and is_up_to_date(src, dst):
+                yield skipped(src, dst)
+                continue
+
+            futures.add(executor.submit(run_job, src, dst, to, profile, cache))
+            if len(futures) >= limit:
+                done, futures = concurrent.futures.wait(
+                    futures, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    yield future.result()
+
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def skipped(src, dst):
+    """Return the `Result` of a font whose output is up to date."""
+    src_size = os.path.getsize(src)
+    return Result(src, dst, src_size, os.path.getsize(dst), True, None, False, None)
+
+
+class Summary(object):
+    """Running totals of the results of a conversion."""
+
+    __slots__ = [
+        "cached",
+        "converted",
+        "dst_size",
+        "failed",
+        "skipped",
+        "src_size",
+        "start",
+    ]
+
+    def __init__(self):
+        self.cached = 0
+        self.converted = 0
+        self.dst_size = 0
+        self.failed = 0
+        self.skipped = 0
+        self.src_size = 0
+        self.start = time.perf_counter()
+
+    def __str__(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        ratio = self.dst_size / self.src_size if self.src_size else 0
+        return (
+            "{} converted ({} from cache), {} skipped, {} failed in {:.2f}s "
+            "({:.1f} fonts/s, {:.2f} MB/s, compression ratio {:.3f})".format(
+                self.converted,
+                self.cached,
+                self.skipped,
+                self.failed,
+                elapsed,
+                self.converted / elapsed,
+                self.src_size / elapsed / 1e6,
+                ratio,
+            )
+        )
+
+    def add(self, result):
+        """Add a result to the totals; only converted fonts count to throughput."""
+        if result.skipped:
+            self.skipped += 1
+
+        elif result.error is not None:
+            self.failed += 1
+
+        else:
+            self.converted += 1
+            self.cached += result.cached
+            self.src_size += result.src_size
+            self.dst_size += result.dst_size
@@ -0,0 +1,194 @@
+from . import batch
+import hashlib
+import os
+import time
+
+# changed whenever the encoders produce different output, to retire old entries
+VERSION = 1
+
+# fraction of the size limit eviction trims the entries down to, so a full
+# cache is not trimmed again on every new entry
+LOW_WATER = 0.9
+
+
+class Cache(object):
+    """Content-addressed cache of converted fonts in a local directory.
+
+    Entries are keyed by a hash of the input data and the options it was
+    converted with, and written atomically so several processes can share a
+    directory. Reading an entry marks it as recently used; once the entries
+    take up more than `max_size` bytes the least recently used are removed,
+    down to `LOW_WATER` of the limit. A `max_size` of None lets the cache grow
+    without limit.
+
+    The directory is only listed the first time the size of the entries is
+    needed; from then on entries stored and read through this object are
+    tracked in memory. Entries written by other processes are counted the
+    next time a cache is opened on the directory.
+    """
+
+    __slots__ = ["hits", "max_size", "misses", "path", "_entries", "_size"]
+
+    def __init__(self, path, max_size=2 ** 30):
+        self.hits = 0
+        self.max_size = max_size
+        self.misses = 0
+        self.path = path
+        self._entries = None
+        self._size = 0
+        os.makedirs(path, exist_ok=True)
+
+    def __repr__(self):
+        return "<Cache {!r} ({} hits, {} misses)>".format(
+            self.path, self.hits, self.misses
+        )
+
+    def convert(self, data, to, profile="default"):
+        """Convert font data to the format `to`, as `batch.convert_bytes`."""
+        key = self.key(data, to=to, profile=profile)
+        converted = self.get(key)
+        if converted is None:
+            converted = batch.convert_bytes(data, to, profile)
+            self.put(key, converted)
+
+        return converted
+
+    def entries(self):
+        """Return a (last used time, size, path) tuple for each entry."""
+        entries = []
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                if name.endswith(".tmp"):
+                    # still being written
+                    continue
+
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+
+                except FileNotFoundError:
+                    # removed by another process
+                    continue
+
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        return entries
+
+    def evict(self, max_size=None):
+        """Remove the least recently used entries until they fit in `max_size`.
+
+        Defaults to `LOW_WATER` of the cache's own size limit.
+        """
+        if max_size is None:
+            if self.max_size is None:
+                return
+
+            max_size = int(self.max_size * LOW_WATER)
+
+        entries = self.load()
+        for path in sorted(entries, key=lambda path: entries[path][0]):
+            if self._size <= max_size:
+                break
+
+            try:
+                os.remove(path)
+
+            except FileNotFoundError:
+                pass
+
+            self._size -= entries.pop(path)[1]
+
+    def get(self, key):
+        """Return the data stored for `key`, or None if there is none."""
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as fp:
+                data = fp.read()
+
+            # the modification time records when the entry was last used
+            os.utime(path)
+
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.touch(key)
+        return data
+
+    def key(self, data, **options):
+        """Return the key for font data converted with the given options."""
+        digest = hashlib.sha256()
+        digest.update(repr((VERSION, sorted(options.items()))).encode())
+        digest.update(data)
+        return digest.hexdigest()
+
+    def load(self):
+        """Return the index of entries, listing the directory the first time.
+
+        The index maps the path of each entry to its last used time and size.
+        """
+        if self._entries is None:
+            self._entries = {path: (used, size) for used, size, path in self.entries()}
+            self._size = sum(size for _, size in self._entries.values())
+
+        return self._entries
+
+    def path_for(self, key):
+        """Return the path an entry is stored at."""
+        return os.path.join(self.path, key[:2], key)
+
+    def put(self, key, data):
+        """Store data for `key`, evicting old entries if over the size limit."""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            with open(temp, "wb") as fp:
+                fp.write(data)
+
+            os.replace(temp, path)
+
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+
+            raise
+
+        self.track(key, len(data))
+
+    def size(self):
+        """Return the number of bytes used by the entries."""
+        self.load()
+        return self._size
+
+    def touch(self, key):
+        """Mark the entry for `key` as used now in the index."""
+        path = self.path_for(key)
+        if self._entries is not None and path in self._entries:
+            self._entries[path] = time.time_ns(), self._entries[path][1]
+
+    def track(self, key, size):
+        """Count a newly stored entry of `size` bytes towards the size limit."""
+        if self.max_size is None:
+            return
+
+        if self._entries is None:
+            # the entry is already included
+            self.load()
+
+        else:
+            path = self.path_for(key)
+            old = self._entries.get(path)
+            self._size += size - (0 if old is None else old[1])
+            self._entries[path] = time.time_ns(), size
+
+        if self._size > self.max_size:
+            self.evict()
+
+    def worker(self):
+        """Return a copy of this cache for worker processes to use.
+
+        The copy has no size limit, so eviction is left to this cache.
+        """
+        return Cache(self.path, None)
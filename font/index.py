@@ -0,0 +1,341 @@
+from . import scanner
+import collections
+import concurrent.futures
+import hashlib
+import os
+import sqlite3
+
+# changed whenever the schema or the scanned fields change, to rebuild indexes
+VERSION = 2
+
+SCHEMA = """
+CREATE TABLE files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT,
+    error TEXT
+);
+CREATE TABLE faces (
+    path TEXT NOT NULL REFERENCES files (path) ON DELETE CASCADE,
+    face INTEGER NOT NULL,
+    format TEXT,
+    sfnt_version TEXT,
+    family TEXT,
+    style TEXT,
+    version TEXT,
+    postscript_name TEXT,
+    units_per_em INTEGER,
+    font_revision REAL,
+    num_glyphs INTEGER,
+    weight_class INTEGER,
+    width_class INTEGER,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (path, face)
+);
+CREATE TABLE face_tables (
+    path TEXT NOT NULL,
+    face INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    checksum INTEGER NOT NULL,
+    digest TEXT,
+    FOREIGN KEY (path, face) REFERENCES faces (path, face) ON DELETE CASCADE
+);
+CREATE TABLE axes (
+    path TEXT NOT NULL,
+    face INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    min REAL,
+    default_value REAL,
+    max REAL,
+    FOREIGN KEY (path, face) REFERENCES faces (path, face) ON DELETE CASCADE
+);
+CREATE INDEX faces_digest ON faces (digest);
+CREATE INDEX face_tables_face ON face_tables (path, face);
+CREATE INDEX face_tables_table ON face_tables (tag, digest);
+CREATE INDEX axes_face ON axes (path, face);
+CREATE INDEX axes_tag ON axes (tag);
+"""
+
+# record fields stored as columns of the faces table
+FACE_FIELDS = scanner.FontRecord._fields[2:-2]
+
+# files stored between commits during an update
+COMMIT_INTERVAL = 1000
+
+# bytes hashed at a time
+HASH_CHUNK_SIZE = 2 ** 20
+
+UpdateSummary = collections.namedtuple(
+    "UpdateSummary", ["scanned", "unchanged", "removed", "failed"]
+)
+
+
+def face_digest(record):
+    """Return a hash of a face's table directory.
+
+    Faces with the same tables, by tag, length and checksum, have the same
+    digest wherever they are stored.
+    """
+    digest = hashlib.sha256()
+    for tag, length, checksum, _ in sorted(record.tables):
+        digest.update("{} {} {}\n".format(tag, length, checksum).encode())
+
+    return digest.hexdigest()
+
+
+def hash_file(fp):
+    """Return the SHA-256 hash of the rest of a file."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fp.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def scan_entry(path, hash=True):
+    """Scan and hash the file at `path`, and each of its tables.
+
+    Returns a (path, hash, records, error) tuple; `error` describes why the
+    file could not be scanned, and is None otherwise.
+    """
+    try:
+        with open(path, "rb") as fp:
+            records = scanner.scan_file(fp, path, hash)
+            if not hash:
+                return path, None, records, None
+
+            fp.seek(0)
+            return path, hash_file(fp), records, None
+
+    except Exception as e:
+        return path, None, None, "{}: {}".format(type(e).__name__, e)
+
+
+class Index(object):
+    """Index of the fonts in a set of files and directories, kept in SQLite.
+
+    Each face is stored with its scanned fields, table directory and axes, and
+    each file with its modification time, size and hash. `update` only scans
+    files that are new or whose modification time or size changed.
+    """
+
+    __slots__ = ["connection", "path"]
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if version != VERSION:
+            self.create()
+
+    def __repr__(self):
+        return "<Index {!r}>".format(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def create(self):
+        """Create the tables of the index, dropping any existing ones."""
+        with self.connection:
+            for table in ("axes", "face_tables", "faces", "files"):
+                self.connection.execute("DROP TABLE IF EXISTS {}".format(table))
+
+            self.connection.executescript(SCHEMA)
+            self.connection.execute("PRAGMA user_version = {}".format(VERSION))
+
+    def update(self, sources, jobs=None, hash=True, chunk_size=64):
+        """Bring the index up to date with the fonts in `sources`.
+
+        Fonts in directories are found as `scanner.find_fonts` does. New and
+        changed files are scanned on a pool of `jobs` processes, or in this
+        process if `jobs` is 1, and indexed files under `sources` that no
+        longer exist are removed. Files that fail to scan are kept with their
+        error, so they are not scanned again until they change. Unless `hash`
+        is False, each file and each of its tables is hashed. Returns an
+        `UpdateSummary` of the number of files in each case.
+        """
+        sources = [os.path.abspath(source) for source in sources]
+        known = {
+            path: (mtime_ns, size)
+            for path, mtime_ns, size in self.connection.execute(
+                "SELECT path, mtime_ns, size FROM files"
+            )
+        }
+        found = set()
+        stats = {}
+        for path in scanner.find_fonts(sources):
+            try:
+                stat = os.stat(path)
+
+            except OSError:
+                continue
+
+            found.add(path)
+            if known.get(path) != (stat.st_mtime_ns, stat.st_size):
+                stats[path] = stat.st_mtime_ns, stat.st_size
+
+        removed = [
+            path
+            for path in known
+            if path not in found and any(is_under(path, source) for source in sources)
+        ]
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM files WHERE path = ?", [(path,) for path in removed]
+            )
+
+        failed = 0
+        with self.connection:
+            entries = self.scan(sorted(stats), jobs, hash, chunk_size)
+            for i, entry in enumerate(entries, 1):
+                path, _, _, error = entry
+                failed += error is not None
+                self.add(entry, *stats[path])
+                if i % COMMIT_INTERVAL == 0:
+                    # keep the work done so far if the update is interrupted
+                    self.connection.commit()
+
+        return UpdateSummary(len(stats), len(found) - len(stats), len(removed), failed)
+
+    @staticmethod
+    def scan(paths, jobs, hash, chunk_size):
+        """Yield `scan_entry` for each path, on a pool of `jobs` processes."""
+        if jobs == 1:
+            for path in paths:
+                yield scan_entry(path, hash)
+
+            return
+
+        with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+            yield from executor.map(
+                scan_entry, paths, [hash] * len(paths), chunksize=chunk_size
+            )
+
+    def add(self, entry, mtime_ns, size):
+        """Store a file's `scan_entry` result, replacing any previous one."""
+        path, file_hash, records, error = entry
+        execute = self.connection.execute
+        execute("DELETE FROM files WHERE path = ?", (path,))
+        execute(
+            "INSERT INTO files VALUES (?, ?, ?, ?, ?)",
+            (path, mtime_ns, size, file_hash, error),
+        )
+        for record in records or ():
+            execute(
+                "INSERT INTO faces VALUES ({})".format(
+                    ", ".join("?" * (len(FACE_FIELDS) + 3))
+                ),
+                (path, record.index)
+                + tuple(getattr(record, field) for field in FACE_FIELDS)
+                + (face_digest(record),),
+            )
+            self.connection.executemany(
+                "INSERT INTO face_tables VALUES (?, ?, ?, ?, ?, ?)",
+                [(path, record.index) + table for table in record.tables],
+            )
+            self.connection.executemany(
+                "INSERT INTO axes VALUES (?, ?, ?, ?, ?, ?)",
+                [(path, record.index) + axis for axis in record.axes],
+            )
+
+    def faces(self, where="1", params=()):
+        """Return the faces matching an SQL condition on the faces table.
+
+        Each face is a `scanner.FontRecord`, with its path, index, axes and
+        table directory as stored.
+        """
+        key_where = "(path, face) IN (SELECT path, face FROM faces WHERE {})".format(
+            where
+        )
+        axes = collections.defaultdict(list)
+        for path, face, *axis in self.connection.execute(
+            "SELECT path, face, tag, min, default_value, max FROM axes"
+            " WHERE {} ORDER BY rowid".format(key_where),
+            params,
+        ):
+            axes[path, face].append(tuple(axis))
+
+        tables = collections.defaultdict(list)
+        for path, face, *table in self.connection.execute(
+            "SELECT path, face, tag, length, checksum, digest FROM face_tables"
+            " WHERE {} ORDER BY tag".format(key_where),
+            params,
+        ):
+            tables[path, face].append(tuple(table))
+
+        faces = []
+        for row in self.connection.execute(
+            "SELECT path, face, {} FROM faces WHERE {} ORDER BY path, face".format(
+                ", ".join(FACE_FIELDS), where
+            ),
+            params,
+        ):
+            key = row[:2]
+            faces.append(scanner.FontRecord(*row, tuple(axes[key]), tuple(tables[key])))
+
+        return faces
+
+    def shared_tables(self, tag):
+        """Return the faces sharing an identical copy of the table `tag`.
+
+        Tables are identical if the SHA-256 hashes of their data are, so faces
+        indexed without hashing are left out. Returns a dict of lists of
+        (path, face index) tuples keyed by the hash, for the copies found in
+        more than one face.
+        """
+        groups = collections.defaultdict(list)
+        for digest, path, face in self.connection.execute(
+            "SELECT digest, path, face FROM face_tables"
+            " WHERE tag = ? AND digest IN ("
+            "SELECT digest FROM face_tables WHERE tag = ?"
+            " GROUP BY digest HAVING COUNT(*) > 1)"
+            " ORDER BY path, face",
+            (tag, tag),
+        ):
+            groups[digest].append((path, face))
+
+        return dict(groups)
+
+    def variable_fonts(self, axis=None):
+        """Return the variable faces, only those with an `axis` if given."""
+        if axis is None:
+            return self.faces("(path, face) IN (SELECT path, face FROM axes)")
+
+        return self.faces(
+            "(path, face) IN (SELECT path, face FROM axes WHERE tag = ?)", (axis,)
+        )
+
+    def duplicates(self):
+        """Return groups of (path, face index) tuples of identical faces.
+
+        Faces are identical if their table directories are.
+        """
+        groups = collections.defaultdict(list)
+        for digest, path, face in self.connection.execute(
+            "SELECT digest, path, face FROM faces WHERE digest IN ("
+            "SELECT digest FROM faces GROUP BY digest HAVING COUNT(*) > 1)"
+            " ORDER BY path, face"
+        ):
+            groups[digest].append((path, face))
+
+        return list(groups.values())
+
+    def errors(self):
+        """Return a (path, error) tuple for each file that failed to scan."""
+        return self.connection.execute(
+            "SELECT path, error FROM files WHERE error IS NOT NULL ORDER BY path"
+        ).fetchall()
+
+
+def is_under(path, directory):
+    """Return whether `path` is `directory` or inside it."""
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
@@ -0,0 +1,125 @@
+import collections
+import contextlib
+import threading
+import time
+
+# callbacks given an `Event` for every table processed; events are only
+# measured while there is at least one
+hooks = []
+
+
+class Event(
+    collections.namedtuple(
+        "Event", ["stage", "tag", "duration", "input_size", "output_size"]
+    )
+):
+    """A stage of processing one table.
+
+    `stage` is one of "read", "decompress", "parse", "pack", "checksum" or
+    "compress". Sizes are None where they do not apply. Read events cover
+    one read of the file, which may span several tables, and have no tag.
+    """
+
+    __slots__ = ()
+
+    @property
+    def ratio(self):
+        """The output size as a fraction of the input size, if both are known."""
+        if not self.input_size or self.output_size is None:
+            return None
+
+        return self.output_size / self.input_size
+
+
+def start():
+    """Return the time to measure an event from, or None if there are no hooks."""
+    return time.perf_counter() if hooks else None
+
+
+def emit(stage, tag, start, input_size=None, output_size=None):
+    """Pass an event that began at `start` to every hook."""
+    event = Event(stage, tag, time.perf_counter() - start, input_size, output_size)
+    for hook in list(hooks):
+        hook(event)
+
+
+def add_hook(hook):
+    """Start passing events to `hook`."""
+    hooks.append(hook)
+
+
+def remove_hook(hook):
+    """Stop passing events to `hook`."""
+    hooks.remove(hook)
+
+
+@contextlib.contextmanager
+def record(hook=None):
+    """Pass events to `hook` within a `with` block.
+
+    By default a new `Counters` is used, which is returned by the block.
+    """
+    hook = Counters() if hook is None else hook
+    add_hook(hook)
+    try:
+        yield hook
+
+    finally:
+        remove_hook(hook)
+
+
+class Counters(object):
+    """Hook totalling the events of each stage, overall and per table tag."""
+
+    __slots__ = ["stages", "tables", "_lock"]
+
+    def __init__(self):
+        self.stages = {}
+        self.tables = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            self.add(self.stages, event.stage, event)
+            if event.tag is not None:
+                self.add(self.tables.setdefault(event.tag, {}), event.stage, event)
+
+    @staticmethod
+    def add(totals, stage, event):
+        total = totals.get(stage)
+        if total is None:
+            total = totals[stage] = {
+                "count": 0,
+                "duration": 0.0,
+                "input_size": 0,
+                "output_size": 0,
+            }
+
+        total["count"] += 1
+        total["duration"] += event.duration
+        total["input_size"] += event.input_size or 0
+        total["output_size"] += event.output_size or 0
+
+    def as_dict(self):
+        """Return the totals, with the compression ratio of each stage."""
+        with self._lock:
+            return {
+                "stages": {
+                    stage: with_ratio(total) for stage, total in self.stages.items()
+                },
+                "tables": {
+                    tag: {stage: with_ratio(total) for stage, total in stages.items()}
+                    for tag, stages in self.tables.items()
+                },
+            }
+
+
+def with_ratio(total):
+    """Return a copy of a stage's totals with its output to input size ratio."""
+    total = dict(total)
+    total["ratio"] = (
+        total["output_size"] / total["input_size"]
+        if total["input_size"] and total["output_size"]
+        else None
+    )
+    return total
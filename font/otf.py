@@ -1,5 +1,6 @@
-from . import tables, utils, woff
+from . import tables, utils, woff, woff2
 import io
+import mmap
 import struct
 
 HEADER_SIZE = 12
@@ -9,25 +10,90 @@ header_s = struct.Struct(">I4H")
 table_s = struct.Struct(">4I")
 
 
+def pack_directory(sfnt_version, entries):
+    """Pack the offset table and table directory of an OTF file.
+
+    `entries` is a list of (tag, checksum, length) tuples, one per table, in
+    the order the tables are to be stored after the directory.
+    """
+    data = [
+        header_s.pack(
+            sfnt_version, len(entries), *utils.calc_search_range(len(entries))
+        )
+    ]
+    offset = HEADER_SIZE + len(entries) * TABLE_SIZE
+    for tag, checksum, length in entries:
+        data.append(table_s.pack(utils.str2tag(tag), checksum, offset, length))
+        offset += length + utils.calc_padding(length)
+
+    return b"".join(data)
+
+
 class File(object):
     """OpenType Font file."""
 
-    __slots__ = ["sfnt_version", "tables"]
+    __slots__ = ["_index", "sfnt_version", "tables"]
 
     def __init__(self):
         """Generate an empty OTF file."""
+        self._index = {}
         self.sfnt_version = utils.str2tag("OTTO")
         self.tables = []
 
+    def __contains__(self, tag):
+        return self._find(tag) is not None
+
+    def __getitem__(self, tag):
+        """Return the table with the given tag, parsing it if it was loaded lazily."""
+        i = self._find(tag)
+        if i is None:
+            raise KeyError(tag)
+
+        table = self.tables[i]
+        if isinstance(table, tables.LazyTable):
+            table = self.tables[i] = table.load()
+
+        return table
+
+    def _find(self, tag):
+        """Return the position of the table with the given tag in `tables`."""
+        i = self._index.get(tag)
+        if i is None or i >= len(self.tables) or self.tables[i].tag != tag:
+            # tables have been added, removed or reordered since the last lookup
+            self._index = {table.tag: i for i, table in enumerate(self.tables)}
+            i = self._index.get(tag)
+
+        return i
+
     @classmethod
-    def from_bytes(cls, bytes):
+    def from_bytes(cls, bytes, lazy=False, tags=None):
         """Generate an OTF file from a string of bytes."""
         fp = io.BytesIO(bytes)
-        return cls.from_file(fp)
+        return cls.from_file(fp, lazy, tags)
+
+    @classmethod
+    def from_path(cls, path, lazy=False, tags=None):
+        """Generate an OTF file by memory-mapping the file at `path`.
+
+        Tables are given zero-copy views of the mapping, so their data is only
+        paged in from disk as it is used. The mapping is released once the file
+        object and all of its tables have been discarded.
+        """
+        with open(path, "rb") as fp:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return cls.from_file(tables.utils.Reader(data), lazy, tags)
 
     @classmethod
-    def from_file(cls, fp):
-        """Generate an OTF file from a file object."""
+    def from_file(cls, fp, lazy=False, tags=None):
+        """Generate an OTF file from a file object.
+
+        The table directory is read first, then the table data in a single
+        pass in file order. If `lazy` is set only the table directory is read;
+        each table is parsed the first time it is accessed, so `fp` must be
+        kept open until then. If `tags` is given only the tables with those
+        tags are read.
+        """
         obj = cls()
         (
             obj.sfnt_version,
@@ -37,58 +103,72 @@ class File(object):
             range_shift,
         ) = header_s.unpack(fp.read(HEADER_SIZE))
 
-        ranges = [range(HEADER_SIZE + num_tables * TABLE_SIZE)]
-
-        for _ in range(num_tables):
-            tag, _, offset, length = table_s.unpack(fp.read(TABLE_SIZE))
-
-            ranges.append(range(offset, offset + length))
-
-            start = fp.tell()
-            fp.seek(offset)
-            table = tables.new_table(utils.tag2str(tag), fp.read(length), obj)
-            fp.seek(start)
-
-            obj.tables.append(table)
+        ranges = [("table directory", range(HEADER_SIZE + num_tables * TABLE_SIZE))]
+        entries = []
+        directory = fp.read(num_tables * TABLE_SIZE)
+        for tag, checksum, offset, length in table_s.iter_unpack(directory):
+            tag = utils.tag2str(tag)
+            ranges.append(("'{}' table".format(tag), range(offset, offset + length)))
+            if tags is None or tag in tags:
+                entries.append((tag, checksum, offset, length))
+
+        utils.validate_ranges(ranges)
+
+        if lazy:
+            obj.tables = [
+                tables.LazyTable(tag, fp, offset, length, obj, checksum)
+                for tag, checksum, offset, length in entries
+            ]
+
+        else:
+            data = utils.read_ranges(
+                fp, ((i, entry[2], entry[3]) for i, entry in enumerate(entries))
+            )
+            obj.tables = [
+                tables.new_table(tag, data[i], obj, checksum)
+                for i, (tag, checksum, _, _) in enumerate(entries)
+            ]
 
         obj.tables.sort(key=lambda table: utils.str2tag(table.tag))
-        if utils.check_range_overlap(ranges):
-            raise Exception("Invalid file; overlapping sections")
 
         return obj
 
     def to_bytes(self):
         """Returns a newly constructed bytes representation of the file."""
+        fp = io.BytesIO()
+        self.to_file(fp)
+        return fp.getvalue()
+
+    def to_file(self, fp):
+        """Write this file to a file object.
+
+        The table directory is worked out first, then each table is packed and
+        written in turn, so only one table's data is held at a time.
+        """
         self.tables.sort(key=lambda table: utils.str2tag(table.tag))
-        search_range, entry_selector, range_shift = utils.calc_search_range(
-            len(self.tables)
-        )
         tags = {table.tag for table in self.tables}
         required = {"cmap", "head", "hhea", "hmtx", "maxp", "name", "OS/2", "post"}
         if len(tags.intersection(required)) < len(required):
             raise Exception("Missing required tables from font.")
 
-        data = header_s.pack(
-            self.sfnt_version,
-            len(self.tables),
-            search_range,
-            entry_selector,
-            range_shift,
-        )
-        font_data = b""
-        offset = HEADER_SIZE + len(self.tables) * TABLE_SIZE
+        entries = []
+        # the original data of unmodified tables, which they hold anyway, so
+        # they are not compared against it again to be written
+        raw_data = []
         for table in self.tables:
-            table_data = table.pack()
-            data += table_s.pack(
-                utils.str2tag(table.tag), table.checksum, offset, len(table_data)
+            table_data = table.to_bytes()
+            entries.append(
+                (table.tag, table.calc_checksum(table_data), len(table_data))
             )
-            font_data += table_data
-            offset += len(table_data)
-            while offset % 4:
-                font_data += b"\0"
-                offset += 1
+            raw_data.append(table_data if table_data is table.raw else None)
+
+        fp.write(pack_directory(self.sfnt_version, entries))
+        for table, table_data in zip(self.tables, raw_data):
+            if table_data is None:
+                table_data = table.to_bytes()
 
-        return data + font_data
+            fp.write(table_data)
+            fp.write(b"\0" * utils.calc_padding(len(table_data)))
 
     def to_woff(self):
         """Generate a WOFF file object from this OTF file."""
@@ -96,3 +176,10 @@ class File(object):
         woff_f.sfnt_version = self.sfnt_version
         woff_f.tables = self.tables.copy()
         return woff_f
+
+    def to_woff2(self):
+        """Generate a WOFF2 file object from this OTF file."""
+        woff2_f = woff2.File()
+        woff2_f.sfnt_version = self.sfnt_version
+        woff2_f.tables = self.tables.copy()
+        return woff2_f
@@ -0,0 +1,271 @@
+from . import batch, tables, transcoder, ttc, utils, woff2
+import collections
+import concurrent.futures
+import hashlib
+import os
+import struct
+import zlib
+
+# tables decoded by a scan; all others are only listed
+SCANNED_TAGS = {"OS/2", "fvar", "head", "maxp", "name"}
+
+name_h_s = struct.Struct(">3H")
+name_record_s = struct.Struct(">6H")
+os2_classes_s = struct.Struct(">2H")
+
+# preferred (platform, encoding, language) of name records, best first; None
+# matches any value
+NAME_PLATFORMS = [
+    (3, 1, 0x409),
+    (3, 10, 0x409),
+    (3, 1, None),
+    (3, 10, None),
+    (0, None, None),
+    (1, 0, 0),
+]
+
+FontRecord = collections.namedtuple(
+    "FontRecord",
+    [
+        "path",
+        "index",
+        "format",
+        "sfnt_version",
+        "family",
+        "style",
+        "version",
+        "postscript_name",
+        "units_per_em",
+        "font_revision",
+        "num_glyphs",
+        "weight_class",
+        "width_class",
+        "axes",
+        "tables",
+    ],
+)
+
+ScanResult = collections.namedtuple("ScanResult", ["path", "records", "error"])
+
+
+def decode_names(data):
+    """Return the strings of a name table, keyed by name ID.
+
+    Where a name is given for several platforms, the Windows English one is
+    preferred.
+    """
+    _, count, string_offset = name_h_s.unpack_from(data)
+    names = {}
+    for i in range(count):
+        platform, encoding, language, name_id, length, offset = (
+            name_record_s.unpack_from(data, name_h_s.size + i * name_record_s.size)
+        )
+        for rank, preferred in enumerate(NAME_PLATFORMS):
+            if all(
+                value is None or value == actual
+                for value, actual in zip(preferred, (platform, encoding, language))
+            ):
+                break
+
+        else:
+            continue
+
+        if name_id in names and names[name_id][0] <= rank:
+            continue
+
+        start = string_offset + offset
+        string = bytes(data[start : start + length])
+        codec = "mac_roman" if platform == 1 else "utf-16-be"
+        names[name_id] = rank, string.decode(codec, "replace")
+
+    return {name_id: string for name_id, (_, string) in names.items()}
+
+
+def make_record(path, index, format, sfnt_version, directory, data):
+    """Build the record of a face from its directory and scanned table data.
+
+    `directory` is a list of (tag, length, checksum, digest) tuples and `data`
+    holds the data of the scanned tables present, keyed by tag.
+    """
+    record = dict.fromkeys(FontRecord._fields)
+    record.update(
+        path=path,
+        index=index,
+        format=format,
+        sfnt_version=utils.tag2str(sfnt_version),
+        axes=(),
+        tables=tuple(sorted(directory)),
+    )
+    if "head" in data:
+        head = tables.new_table("head", data["head"], None)
+        record.update(
+            units_per_em=head.units_per_em, font_revision=head.font_revision / 65536
+        )
+
+    if "maxp" in data:
+        maxp = tables.new_table("maxp", data["maxp"], None)
+        record.update(num_glyphs=maxp.num_glyphs)
+
+    if "OS/2" in data:
+        weight_class, width_class = os2_classes_s.unpack_from(data["OS/2"], 4)
+        record.update(weight_class=weight_class, width_class=width_class)
+
+    if "fvar" in data:
+        fvar = tables.new_table("fvar", data["fvar"], None)
+        record.update(
+            axes=tuple(
+                (axis.axis_tag, axis.min_value, axis.default_value, axis.max_value)
+                for axis in fvar.axes
+            )
+        )
+
+    if "name" in data:
+        names = decode_names(data["name"])
+        record.update(
+            family=names.get(16, names.get(1)),
+            style=names.get(17, names.get(2)),
+            version=names.get(5),
+            postscript_name=names.get(6),
+        )
+
+    return FontRecord(**record)
+
+
+def table_digest(data):
+    """Return the SHA-256 hash of a table's uncompressed data."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def scan_face(fp, path, index, format, font_offset=0, digests=False):
+    """Scan the OTF or WOFF font starting at `font_offset`.
+
+    Only the scanned tables are read, and decompressed, in one pass, unless
+    `digests` is set, in which case every table is read to be hashed.
+    """
+    fp.seek(font_offset)
+    header, entries = transcoder.read_directory(fp, format)
+    needed = [entry for entry in entries if digests or entry[0] in SCANNED_TAGS]
+    data = utils.read_ranges(fp, ((entry[0], entry[1], entry[2]) for entry in needed))
+    for tag, _, comp, length, _ in needed:
+        if comp < length:
+            data[tag] = zlib.decompress(data[tag])
+
+    directory = [
+        (tag, length, checksum, table_digest(data[tag]) if digests else None)
+        for tag, _, _, length, checksum in entries
+    ]
+    return make_record(path, index, format, header["sfnt_version"], directory, data)
+
+
+def scan_woff2(fp, path, digests=False):
+    """Scan a WOFF2 font or collection.
+
+    The tables of a WOFF2 file are compressed as one stream, so every table
+    is decompressed.
+    """
+    woff2_f = woff2.File.from_file(fp)
+    fonts = woff2_f.fonts if woff2_f.is_collection else [woff2_f]
+    records = []
+    for index, font in enumerate(fonts):
+        directory = []
+        data = {}
+        for table in font.tables:
+            table_data = table.to_bytes()
+            directory.append(
+                (
+                    table.tag,
+                    len(table_data),
+                    table.calc_checksum(table_data),
+                    table_digest(table_data) if digests else None,
+                )
+            )
+            if table.tag in SCANNED_TAGS:
+                data[table.tag] = table_data
+
+        records.append(
+            make_record(path, index, "woff2", font.sfnt_version, directory, data)
+        )
+
+    return records
+
+
+def scan(path_or_fp, digests=False):
+    """Read a summary of each font in a file, without reading every table.
+
+    Only the header, table directory and the head, maxp, fvar, name and OS/2
+    tables are read. Returns a list of `FontRecord`, with one record for each
+    font in a collection and a single record otherwise.
+
+    A record's `axes` is a tuple of (tag, min, default, max) tuples, one per
+    variation axis, and its `tables` a tuple of (tag, length, checksum,
+    digest) tuples, one per table, as given in the table directory. Fields
+    read from tables the font lacks are None.
+
+    The digest of a table is the SHA-256 hash of its uncompressed data. It is
+    only calculated, reading every table, if `digests` is set, and is None
+    otherwise.
+    """
+    if isinstance(path_or_fp, (str, bytes, os.PathLike)):
+        with open(path_or_fp, "rb") as fp:
+            return scan_file(fp, os.fspath(path_or_fp), digests)
+
+    return scan_file(path_or_fp, getattr(path_or_fp, "name", None), digests)
+
+
+def scan_file(fp, path=None, digests=False):
+    """Scan an open font file, as `scan`."""
+    format, _ = batch.detect_format(fp.read(8))
+    fp.seek(0)
+    if format == "woff2":
+        return scan_woff2(fp, path, digests)
+
+    if format != "ttc":
+        return [scan_face(fp, path, 0, format, digests=digests)]
+
+    _, _, _, num_fonts = ttc.header_s.unpack(fp.read(ttc.HEADER_SIZE))
+    offsets = struct.unpack(">{}I".format(num_fonts), fp.read(4 * num_fonts))
+    return [
+        scan_face(fp, path, index, "otf", font_offset, digests)
+        for index, font_offset in enumerate(offsets)
+    ]
+
+
+def scan_path(path):
+    """Scan the font at `path`, returning a `ScanResult` instead of raising."""
+    try:
+        return ScanResult(path, scan(path), None)
+
+    except Exception as e:
+        return ScanResult(path, None, "{}: {}".format(type(e).__name__, e))
+
+
+def find_fonts(sources):
+    """Yield the path of each font in `sources`, searching directories."""
+    for source in sources:
+        if not os.path.isdir(source):
+            yield source
+            continue
+
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in batch.EXTENSIONS:
+                    yield os.path.join(root, name)
+
+
+def scan_all(sources, jobs=None, chunk_size=64):
+    """Scan every font in `sources`, which may be files or directories.
+
+    Fonts are scanned on a pool of `jobs` processes, or in this process if
+    `jobs` is 1, in chunks of `chunk_size` files. A `ScanResult` is yielded
+    for each file, in order; files that fail to scan have an `error`.
+    """
+    paths = find_fonts(sources)
+    if jobs == 1:
+        for path in paths:
+            yield scan_path(path)
+
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        yield from executor.map(scan_path, paths, chunksize=chunk_size)
@@ -6,6 +6,15 @@ ebsc_bitmap_scale_s = struct.Struct("4B")
 
 
 class BitmapScaleTable(object):
+    __slots__ = [
+        "hori",
+        "ppem_x",
+        "ppem_y",
+        "substitute_ppem_x",
+        "substitute_ppem_y",
+        "vert",
+    ]
+
     def __init__(self, data):
         self.hori = SBitLineMetrics(data)
         self.vert = SBitLineMetrics(data)
@@ -27,6 +36,9 @@ class BitmapScaleTable(object):
 
 
 class EmbeddedBitmapScalingTable(Table):
+    __slots__ = ["bitmap_scale_tables"]
+    record_lists = ("bitmap_scale_tables",)
+
     def __init__(self, *args):
         super().__init__(*args)
         _, _, num_sizes = ebsc_h_s.unpack(self.data.read(8))
@@ -37,5 +49,5 @@ class EmbeddedBitmapScalingTable(Table):
 
     def pack(self):
         return ebsc_h_s.pack(2, 0, len(self.bitmap_scale_tables)) + b"".join(
-            table.pack for table in self.bitmap_scale_tables
+            table.pack() for table in self.bitmap_scale_tables
         )
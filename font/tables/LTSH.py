@@ -1,3 +1,4 @@
+from ..utils import pack_array, unpack_array
 from .utils import Table
 import struct
 
@@ -5,13 +6,14 @@ ltsh_s = struct.Struct(">2H")
 
 
 class LinearThresholdTable(Table):
+    __slots__ = ["y_pels"]
+    record_lists = ("y_pels",)
+
     def __init__(self, *args):
         super().__init__(*args)
         _, num_glyphs = ltsh_s.unpack(self.data.read(4))
-        self.y_pels = struct.unpack(f"{num_glyphs}B", self.data.read(num_glyphs))
+        self.y_pels = unpack_array(self.data.read(num_glyphs), "u1")
         del self.data
 
     def pack(self):
-        return ltsh_s.pack(0, len(self.y_pels)) + struct.pack(
-            f"{len(self.y_pels)}B", *self.y_pels
-        )
+        return ltsh_s.pack(0, len(self.y_pels)) + pack_array(self.y_pels, "u1")
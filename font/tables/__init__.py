@@ -9,17 +9,39 @@ from . import (
     gcid,
     head,
     hhea,
+    hmtx,
     LTSH,
     maxp,
     prep,
     meta,
     utils,
+    vhea,
+    vmtx,
 )
-import io
+from .. import instrument
+from ..utils import calc_checksum
 
 
-def new_table(tag, data, parent):
-    data = io.BytesIO(data)
+def new_table(tag, data, parent, checksum=None):
+    """Parse a table, remembering its original data and directory checksum.
+
+    Until the table is modified its original data is written out as it is,
+    instead of being packed again.
+    """
+    start = instrument.start()
+    data = utils.Reader(data)
+    table = parse_table(tag, data, parent)
+    if start is not None:
+        instrument.emit("parse", tag, start, len(data))
+
+    table.raw = data.getbuffer()
+    table.raw_checksum = checksum
+    table._snapshot = table.snapshot()
+    table._changed = False
+    return table
+
+
+def parse_table(tag, data, parent):
     if tag == "avar":
         return avar.AxisVariationsTable(tag, data, parent)
 
@@ -50,6 +72,9 @@ def new_table(tag, data, parent):
     if tag == "hhea":
         return hhea.HorizontalHeaderTable(tag, data, parent)
 
+    if tag == "hmtx":
+        return hmtx.HorizontalMetricsTable(tag, data, parent)
+
     if tag == "LTSH":
         return LTSH.LinearThresholdTable(tag, data, parent)
 
@@ -62,5 +87,82 @@ def new_table(tag, data, parent):
     if tag == "meta":
         return meta.MetadataTable(tag, data, parent)
 
+    if tag == "vhea":
+        return vhea.VerticalHeaderTable(tag, data, parent)
+
+    if tag == "vmtx":
+        return vmtx.VerticalMetricsTable(tag, data, parent)
+
     else:
         return utils.Table(tag, data, parent)
+
+
+class LazyTable(object):
+    """Placeholder for a table that is only parsed when it is first used.
+
+    Only the location of the table is recorded when the font is opened; the
+    table data is read and decoded by `new_table` on first attribute access.
+    The source file object must remain open until then.
+    """
+
+    __slots__ = ["tag", "parent", "_checksum", "_fp", "_offset", "_length", "_table"]
+
+    def __init__(self, tag, fp, offset, length, parent, checksum=None):
+        self.tag = tag
+        self.parent = parent
+        self._checksum = checksum
+        self._fp = fp
+        self._offset = offset
+        self._length = length
+        self._table = None
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __setattr__(self, name, value):
+        if name in LazyTable.__slots__:
+            object.__setattr__(self, name, value)
+
+        else:
+            setattr(self.load(), name, value)
+
+    def __repr__(self):
+        if self._table is None:
+            return " ".join(
+                i for i in "<{} Table (unloaded)>".format(self.tag).split() if i != ""
+            )
+
+        return repr(self._table)
+
+    @property
+    def loaded(self):
+        """Whether the table has been parsed yet."""
+        return self._table is not None
+
+    def calc_checksum(self, data):
+        """Calculate the checksum of this table's data, without parsing it."""
+        if self._table is not None:
+            return self._table.calc_checksum(data)
+
+        if self._checksum is not None:
+            return self._checksum
+
+        return calc_checksum(data, self.tag)
+
+    def load(self):
+        """Parse the table, if not already done, and return it."""
+        if self._table is None:
+            self._table = new_table(
+                self.tag, self.to_bytes(), self.parent, self._checksum
+            )
+            self._fp = None
+
+        return self._table
+
+    def to_bytes(self):
+        """Return the data to write for this table, without parsing it."""
+        if self._table is not None:
+            return self._table.to_bytes()
+
+        self._fp.seek(self._offset)
+        return self._fp.read(self._length)
@@ -3,10 +3,12 @@ import struct
 
 avar_h_s = struct.Struct(">4H")
 avar_segment_maps_s = struct.Struct(">H")
-avar_axis_value_map_s = struct.Struct(">2H")
+avar_axis_value_map_s = struct.Struct(">2h")
 
 
 class AxisValueMapRecord(object):
+    __slots__ = ["from_coordinate", "to_coordinate"]
+
     def __init__(self, data):
         (self.from_coordinate, self.to_coordinate) = avar_axis_value_map_s.unpack(
             data.read(4)
@@ -16,13 +18,15 @@ class AxisValueMapRecord(object):
 
     def pack(self):
         return avar_axis_value_map_s.pack(
-            int(self.from_coordinate * 2 ** 14), int(self.to_coordinate * 2 ** 14)
+            round(self.from_coordinate * 2 ** 14), round(self.to_coordinate * 2 ** 14)
         )
 
 
 class SegmentMapRecord(object):
+    __slots__ = ["axis_value_maps"]
+
     def __init__(self, data):
-        position_map_count = avar_segment_maps_s.unpack(data.read(2))
+        (position_map_count,) = avar_segment_maps_s.unpack(data.read(2))
         self.axis_value_maps = [
             AxisValueMapRecord(data) for _ in range(position_map_count)
         ]
@@ -34,6 +38,9 @@ class SegmentMapRecord(object):
 
 
 class AxisVariationsTable(Table):
+    __slots__ = ["axis_segment_maps"]
+    record_lists = ("axis_segment_maps",)
+
     def __init__(self, *args):
         super().__init__(*args)
         (_, _, _, axis_count) = avar_h_s.unpack(self.data.read(8))
@@ -2,4 +2,4 @@ from .head import FontHeaderTable
 
 # identical to font header table
 class BitmapFontHeaderTable(FontHeaderTable):
-    pass
+    __slots__ = ()
@@ -1,14 +1,16 @@
+from ..utils import pack_array, unpack_array
 from .utils import Table
-import struct
 
 
 class ControlValueTable(Table):
+    __slots__ = ["control_values"]
+    record_lists = ("control_values",)
+
     def __init__(self, *args):
         super().__init__(*args)
-        n = len(self.data.read())
-        self.data.seek(0)
-        self.control_values = struct.unpack(f"{n // 2}H", self.data.read())
+        data = self.data.read()
+        self.control_values = unpack_array(data[: len(data) - len(data) % 2], ">i2")
         del self.data
 
     def pack(self):
-        return struct.pack(f"{len(self.control_values)}H" * self.control_values)
+        return pack_array(self.control_values, ">i2")
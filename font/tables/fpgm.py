@@ -1,14 +1,15 @@
+from ..utils import pack_array, unpack_array
 from .utils import Table
-import struct
 
 
 class FontProgramTable(Table):
+    __slots__ = ["instructions"]
+    record_lists = ("instructions",)
+
     def __init__(self, *args):
         super().__init__(*args)
-        n = len(self.data.read())
-        self.data.seek(0)
-        self.instructions = struct.unpack(f"{n}B", self.data.read())
+        self.instructions = unpack_array(self.data.read(), "u1")
         del self.data
 
     def pack(self):
-        return struct.pack(f"{len(self.instructions)}B", *self.instructions)
+        return pack_array(self.instructions, "u1")
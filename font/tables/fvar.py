@@ -1,14 +1,23 @@
-from ..utils import str2tag, tag2str
+from ..utils import pack_fixed_array, str2tag, tag2str, unpack_fixed_array
 from .utils import Table
 import struct
 
 fvar_h_s = struct.Struct(">8H")
-fvar_variation_axis_record_s = struct.Struct(">4I2H")
+fvar_variation_axis_record_s = struct.Struct(">I3i2H")
 fvar_instance_record_p0_s = struct.Struct(">2H")
 fvar_instance_record_op_s = struct.Struct(">H")
 
 
 class VariationAxisRecord(object):
+    __slots__ = [
+        "axis_name_id",
+        "axis_tag",
+        "default_value",
+        "flags",
+        "max_value",
+        "min_value",
+    ]
+
     def __init__(self, data):
         (
             axis_tag,
@@ -19,43 +28,37 @@ class VariationAxisRecord(object):
             self.axis_name_id,
         ) = fvar_variation_axis_record_s.unpack(data.read(20))
         self.axis_tag = tag2str(axis_tag)
-        self.min_value /= 256
-        self.default_value /= 256
-        self.max_value /= 256
+        self.min_value /= 65536
+        self.default_value /= 65536
+        self.max_value /= 65536
 
     def pack(self):
         return fvar_variation_axis_record_s.pack(
             str2tag(self.axis_tag),
-            int(self.min_value * 256),
-            int(self.default_value * 256),
-            int(self.max_value * 256),
+            round(self.min_value * 65536),
+            round(self.default_value * 65536),
+            round(self.max_value * 65536),
             self.flags,
             self.axis_name_id,
         )
 
 
 class InstanceRecord(object):
+    __slots__ = ["coordinates", "flags", "post_script_name_id", "subfamily_name_id"]
+
     def __init__(self, data, axis_count, instance_size):
         (self.subfamily_name_id, self.flags) = fvar_instance_record_p0_s.unpack(
             data.read(4)
         )
-        self.coordinates = [
-            i / 256 for i in struct.unpack(f"{axis_count}I", data.read(4 * axis_count))
-        ]
-
-        instance_size -= 4 * (axis_count + 1)
-        instance_size /= 2
+        self.coordinates = unpack_fixed_array(data.read(4 * axis_count))
         self.post_script_name_id = None
-        if instance_size:
+        if instance_size >= 6 + 4 * axis_count:
             self.post_script_name_id = fvar_instance_record_op_s.unpack(data.read(2))[0]
 
     def pack(self):
         return (
             fvar_instance_record_p0_s.pack(self.subfamily_name_id, self.flags)
-            + struct.pack(
-                f"{len(self.coordinates)}I",
-                *[int(coord * 256) for coord in self.coordinates],
-            )
+            + pack_fixed_array(self.coordinates)
             + (
                 fvar_instance_record_op_s.pack(self.post_script_name_id)
                 if self.post_script_name_id is not None
@@ -65,6 +68,9 @@ class InstanceRecord(object):
 
 
 class FontVariationsTable(Table):
+    __slots__ = ["axes", "instances"]
+    record_lists = ("axes", "instances")
+
     def __init__(self, *args):
         super().__init__(*args)
         (
@@ -73,18 +79,19 @@ class FontVariationsTable(Table):
             axes_array_offset,
             _,
             axis_count,
-            _,
+            axis_size,
             instance_count,
             instance_size,
         ) = fvar_h_s.unpack(self.data.read(16))
         self.axes = []
-        self.data.seek(axes_array_offset)
-        for _ in range(axis_count):
+        for i in range(axis_count):
+            self.data.seek(axes_array_offset + i * axis_size)
             self.axes.append(VariationAxisRecord(self.data))
 
-        instance_size -= axis_count * 4
+        instances_offset = axes_array_offset + axis_count * axis_size
         self.instances = []
-        for _ in range(instance_count):
+        for i in range(instance_count):
+            self.data.seek(instances_offset + i * instance_size)
             self.instances.append(InstanceRecord(self.data, axis_count, instance_size))
 
         del self.data
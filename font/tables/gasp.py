@@ -5,6 +5,8 @@ gasp_s = struct.Struct(">2H")
 
 
 class GaspRangeRecord(object):
+    __slots__ = ["range_gasp_behavior", "range_max_ppem"]
+
     def __init__(self, data):
         (self.range_max_ppem, self.range_gasp_behavior) = gasp_s.unpack(data.read(4))
 
@@ -13,6 +15,9 @@ class GaspRangeRecord(object):
 
 
 class GridFittingAndScanConversionProcedureTable(Table):
+    __slots__ = ["records"]
+    record_lists = ("records",)
+
     def __init__(self, *args):
         super().__init__(*args)
         _, num_ranges = gasp_s.unpack(self.data.read(4))
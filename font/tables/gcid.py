@@ -1,3 +1,4 @@
+from ..utils import pack_array, unpack_array
 from .utils import Table
 import struct
 
@@ -5,8 +6,18 @@ gcid_s = struct.Struct(">2HIH64sH64s2H")
 
 
 class GlyphToCIDMappingTable(Table):
+    __slots__ = [
+        "cids",
+        "order",
+        "order_name",
+        "registry",
+        "registry_name",
+        "supplement_version",
+    ]
+    record_lists = ("cids",)
+
     def __init__(self, *args):
-        super().__init__(self, *args)
+        super().__init__(*args)
         (
             _,
             _,
@@ -17,24 +28,21 @@ class GlyphToCIDMappingTable(Table):
             order_name,
             self.supplement_version,
             count,
-        ) = gcid_s.unpack(self.data.read(124))
-        self.registry_name = registry_name.rstrip("\0")
-        self.order_name = order_name.rstrip("\0")
-        self.cids = struct.unpack(f">{count}H", self.data.read(2 * count))
+        ) = gcid_s.unpack(self.data.read(gcid_s.size))
+        self.registry_name = registry_name.rstrip(b"\0").decode("latin-1")
+        self.order_name = order_name.rstrip(b"\0").decode("latin-1")
+        self.cids = unpack_array(self.data.read(2 * count), ">u2")
         del self.data
 
     def pack(self, *args):
-        return (
-            gcid_s.pack(
-                0,
-                0,
-                124 + 2 * len(self.cids),
-                self.registry,
-                self.registry_name[:64].ljust(64, "\0"),
-                self.order,
-                self.order_name[:64].ljust(64, "\0"),
-                self.supplement_version,
-                len(self.cids),
-            )
-            + struct.pack(f">{len(self.cids)}H", *self.cids)
-        )
+        return gcid_s.pack(
+            0,
+            0,
+            gcid_s.size + 2 * len(self.cids),
+            self.registry,
+            self.registry_name.encode("latin-1"),
+            self.order,
+            self.order_name.encode("latin-1"),
+            self.supplement_version,
+            len(self.cids),
+        ) + pack_array(self.cids, ">u2")
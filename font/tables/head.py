@@ -5,6 +5,24 @@ head_s = struct.Struct(">2H3I2H2Q4h2H3h")
 
 
 class FontHeaderTable(Table):
+    __slots__ = [
+        "checksum_adjustment",
+        "created",
+        "flags",
+        "font_direction_hint",
+        "font_revision",
+        "glyph_data_format",
+        "index_to_loc_format",
+        "lowest_rec_ppem",
+        "mac_style",
+        "modified",
+        "units_per_em",
+        "x_max",
+        "x_min",
+        "y_max",
+        "y_min",
+    ]
+
     def __init__(self, *args):
         super().__init__(*args)
         (
@@ -29,15 +47,6 @@ class FontHeaderTable(Table):
         ) = head_s.unpack(self.data.read(54))
         del self.data
 
-    @property
-    def checksum(self):
-        """Calculate checksum for this table."""
-        tmp = self.checksum_adjustment
-        self.checksum_adjustment = 0
-        value = super().checksum
-        self.checksum_adjustment = tmp
-        return value
-
     def pack(self):
         return head_s.pack(
             1,
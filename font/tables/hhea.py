@@ -5,6 +5,20 @@ hhea_s = struct.Struct(">2H3hH11hH")
 
 
 class HorizontalHeaderTable(Table):
+    __slots__ = [
+        "advance_width_max",
+        "ascender",
+        "caret_offset",
+        "caret_slope_rise",
+        "caret_slope_run",
+        "descender",
+        "line_gap",
+        "min_left_side_bearing",
+        "min_right_side_bearing",
+        "number_of_h_metrics",
+        "x_max_extent",
+    ]
+
     def __init__(self, *args):
         super().__init__(*args)
         (
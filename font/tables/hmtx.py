@@ -0,0 +1,300 @@
+from .. import instrument
+from ..utils import numpy, unpack_array
+from .utils import Table
+import array
+import struct
+
+
+class HorizontalMetricsTable(Table):
+    """Advance widths and left side bearings of every glyph.
+
+    `advances` and `bearings` hold one value per glyph, including the glyphs
+    that share the last advance in the font, as NumPy arrays if NumPy is
+    installed or `array.array`s otherwise, so many glyphs can be looked up
+    at once with `advances[glyph_ids]`. The number of glyphs and of full
+    metrics are given by the maxp and hhea tables, so the data is only
+    decoded once the rest of the font has been read, the first time either
+    is used.
+    """
+
+    __slots__ = ["_advances", "_bearings"]
+    record_lists = ("_advances", "_bearings")
+
+    # header table giving the number of full metrics, and the axis of glyph
+    # extents the side bearings are measured along
+    header_tag = "hhea"
+    axis = 0
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._advances = None
+        self._bearings = None
+
+    @property
+    def advances(self):
+        self.decode()
+        return self._advances
+
+    @advances.setter
+    def advances(self, value):
+        self.decode()
+        self._advances = value
+
+    @property
+    def bearings(self):
+        self.decode()
+        return self._bearings
+
+    @bearings.setter
+    def bearings(self, value):
+        self.decode()
+        self._bearings = value
+
+    def find_sibling(self, tag):
+        """Return the table with the given tag from the same font, or None."""
+        for table in getattr(self.parent, "tables", ()):
+            if table.tag == tag:
+                return table
+
+        return None
+
+    def decode(self):
+        """Decode the metrics, if not already done."""
+        if self._advances is not None:
+            return
+
+        start = instrument.start()
+        data = self.data.getbuffer()
+        header = self.find_sibling(self.header_tag)
+        maxp = self.find_sibling("maxp")
+        if header is None and maxp is None:
+            raise Exception(
+                "Invalid {} table; expected {} or maxp table, received neither".format(
+                    self.tag, self.header_tag
+                )
+            )
+
+        if header is None:
+            num_glyphs = maxp.num_glyphs
+            num_metrics = len(data) // 2 - num_glyphs
+
+        else:
+            num_metrics = header.number_of_h_metrics
+            num_glyphs = (
+                num_metrics + (len(data) - 4 * num_metrics) // 2
+                if maxp is None
+                else maxp.num_glyphs
+            )
+
+        length = 2 * (num_metrics + num_glyphs)
+        if not 0 < num_metrics <= num_glyphs or len(data) < length:
+            raise Exception(
+                "Invalid {} table; expected {} bytes for {} metrics of {} glyphs, "
+                "received {}".format(
+                    self.tag, length, num_metrics, num_glyphs, len(data)
+                )
+            )
+
+        words = unpack_array(data[: 4 * num_metrics], ">u2")
+        signed = unpack_array(data[:length], ">i2")
+        if numpy is not None:
+            advances = numpy.empty(num_glyphs, numpy.uint16)
+            advances[:num_metrics] = words[0::2]
+            advances[num_metrics:] = words[-2]
+            bearings = numpy.empty(num_glyphs, numpy.int16)
+            bearings[:num_metrics] = signed[1 : 2 * num_metrics : 2]
+            bearings[num_metrics:] = signed[2 * num_metrics :]
+
+        else:
+            advances = array.array("H", words[0::2])
+            advances.extend([words[-2]] * (num_glyphs - num_metrics))
+            bearings = array.array("h", signed[1 : 2 * num_metrics : 2])
+            bearings.extend(signed[2 * num_metrics :])
+
+        # decoding is not a change, so the record lists are set directly
+        object.__setattr__(self, "_advances", advances)
+        object.__setattr__(self, "_bearings", bearings)
+        self._snapshot = self.snapshot()
+        del self.data
+        if start is not None:
+            instrument.emit("parse", self.tag, start, len(data))
+
+    def count_metrics(self):
+        """Return the fewest full metrics that encode the advances.
+
+        Glyphs after the last full metric share its advance.
+        """
+        advances = self.advances
+        if not len(advances):
+            return 0
+
+        if numpy is not None:
+            differing = numpy.flatnonzero(numpy.asarray(advances) != advances[-1])
+            return int(differing[-1]) + 2 if len(differing) else 1
+
+        num_metrics = len(advances)
+        while num_metrics > 1 and advances[num_metrics - 2] == advances[-1]:
+            num_metrics -= 1
+
+        return num_metrics
+
+    def pack(self):
+        advances = self.advances
+        bearings = self.bearings
+        num_glyphs = len(advances)
+        header = self.find_sibling(self.header_tag)
+        if header is None:
+            num_metrics = self.count_metrics()
+
+        else:
+            num_metrics = header.number_of_h_metrics
+            if not self.count_metrics() <= num_metrics <= num_glyphs:
+                raise Exception(
+                    "Invalid {} table; expected the glyphs after the first {} to "
+                    "share an advance, as given by the {} table; call "
+                    "update_header() first".format(
+                        self.tag, num_metrics, self.header_tag
+                    )
+                )
+
+        if numpy is not None:
+            data = numpy.empty(num_metrics + num_glyphs, ">u2")
+            data[0 : 2 * num_metrics : 2] = advances[:num_metrics]
+            data[1 : 2 * num_metrics : 2] = numpy.asarray(bearings, numpy.int16)[
+                :num_metrics
+            ].view(numpy.uint16)
+            data[2 * num_metrics :] = numpy.asarray(bearings, numpy.int16)[
+                num_metrics:
+            ].view(numpy.uint16)
+            return data.tobytes()
+
+        metrics = [
+            value
+            for metric in zip(advances[:num_metrics], bearings[:num_metrics])
+            for value in metric
+        ]
+        return struct.pack(
+            ">{}{}h".format("Hh" * num_metrics, num_glyphs - num_metrics),
+            *metrics,
+            *bearings[num_metrics:],
+        )
+
+    def glyph_extents(self):
+        """Read the extents of each glyph from the glyf and loca tables.
+
+        Returns a (mask, minimums, maximums) tuple of per-glyph arrays along
+        the table's axis, where `mask` is set for glyphs with an outline, or
+        None if the font has no glyf table.
+        """
+        glyf = self.find_sibling("glyf")
+        loca = self.find_sibling("loca")
+        head = self.find_sibling("head")
+        if glyf is None or loca is None or head is None:
+            return None
+
+        num_glyphs = len(self.advances)
+        glyf_data = glyf.to_bytes()
+        offsets = unpack_array(
+            memoryview(loca.to_bytes())[
+                : (num_glyphs + 1) * (2 if head.index_to_loc_format == 0 else 4)
+            ],
+            ">u2" if head.index_to_loc_format == 0 else ">u4",
+        )
+        if len(offsets) != num_glyphs + 1:
+            raise Exception(
+                "Invalid loca table; expected {} offsets, received {}".format(
+                    num_glyphs + 1, len(offsets)
+                )
+            )
+
+        scale = 2 if head.index_to_loc_format == 0 else 1
+        field = 2 + 2 * self.axis
+        if numpy is not None:
+            offsets = offsets.astype(numpy.int64) * scale
+            mask = offsets[1:] > offsets[:-1]
+            starts = offsets[:-1][mask]
+            glyf_bytes = numpy.frombuffer(glyf_data, numpy.uint8)
+            minimums = numpy.zeros(num_glyphs, numpy.int32)
+            maximums = numpy.zeros(num_glyphs, numpy.int32)
+            for values, pos in ((minimums, field), (maximums, field + 4)):
+                high = glyf_bytes[starts + pos].astype(numpy.uint16) << 8
+                values[mask] = (high | glyf_bytes[starts + pos + 1]).view(numpy.int16)
+
+            return mask, minimums, maximums
+
+        mask = []
+        minimums = []
+        maximums = []
+        for i in range(num_glyphs):
+            start = offsets[i] * scale
+            mask.append(offsets[i + 1] * scale > start)
+            minimum, maximum = (
+                struct.unpack_from(">h2xh", glyf_data, start + field)
+                if mask[-1]
+                else (0, 0)
+            )
+            minimums.append(minimum)
+            maximums.append(maximum)
+
+        return mask, minimums, maximums
+
+    def update_header(self, extents=None):
+        """Recompute the aggregates of the header table from the metrics.
+
+        The number of full metrics and largest advance are always updated.
+        The smallest side bearings and largest extent are updated from
+        `extents`, a tuple as returned by `glyph_extents`, which is read from
+        the font by default; they are left as they are for fonts without a
+        glyf table.
+        """
+        header = self.find_sibling(self.header_tag)
+        if header is None:
+            raise Exception(
+                "Invalid font; expected {} table, received none".format(self.header_tag)
+            )
+
+        advances = self.advances
+        bearings = self.bearings
+        num_metrics = self.count_metrics()
+        if header.number_of_h_metrics != num_metrics:
+            header.number_of_h_metrics = num_metrics
+            # the original data holds the old number of full metrics, so the
+            # metrics have to be packed again to match the header
+            self._changed = True
+
+        header.advance_width_max = int(max(advances)) if len(advances) else 0
+        if extents is None:
+            extents = self.glyph_extents()
+            if extents is None:
+                return
+
+        mask, minimums, maximums = extents
+        if numpy is not None:
+            mask = numpy.asarray(mask, bool)
+            if not mask.any():
+                return
+
+            first = numpy.asarray(bearings, numpy.int32)[mask]
+            extent = first + (
+                numpy.asarray(maximums, numpy.int32)[mask]
+                - numpy.asarray(minimums, numpy.int32)[mask]
+            )
+            last = numpy.asarray(advances, numpy.int32)[mask] - extent
+            header.min_left_side_bearing = int(first.min())
+            header.min_right_side_bearing = int(last.min())
+            header.x_max_extent = int(extent.max())
+            return
+
+        outlines = [
+            (bearing, bearing + maximum - minimum, advance)
+            for bearing, minimum, maximum, advance, has_outline in zip(
+                bearings, minimums, maximums, advances, mask
+            )
+            if has_outline
+        ]
+        if outlines:
+            header.min_left_side_bearing = min(first for first, _, _ in outlines)
+            header.min_right_side_bearing = min(
+                advance - extent for _, extent, advance in outlines
+            )
+            header.x_max_extent = max(extent for _, extent, _ in outlines)
@@ -6,6 +6,24 @@ maxp_v1_s = struct.Struct(">13H")
 
 
 class MaximunProfileTable(Table):
+    __slots__ = [
+        "max_component_depth",
+        "max_component_elements",
+        "max_composite_contours",
+        "max_composite_points",
+        "max_contours",
+        "max_function_defs",
+        "max_instruction_defs",
+        "max_points",
+        "max_size_of_instructions",
+        "max_stack_elements",
+        "max_storage",
+        "max_twilight_points",
+        "max_zones",
+        "num_glyphs",
+        "version",
+    ]
+
     def __init__(self, *args):
         super().__init__(*args)
         self.version, self.num_glyphs = maxp_v0_5_s.unpack(self.data.read(6))
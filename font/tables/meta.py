@@ -7,12 +7,14 @@ meta_data_map_s = struct.Struct(">3I")
 
 
 class DataMapRecord(object):
+    __slots__ = ["data", "tag"]
+
     def __init__(self, data):
         (tag, data_offset, data_length) = meta_data_map_s.unpack(data.read(12))
         self.tag = tag2str(tag)
         start = data.tell()
         data.seek(data_offset)
-        self.data = data.read(data_length)
+        self.data = bytes(data.read(data_length))
         data.seek(start)
 
         if self.tag in ["dlng", "slng"]:
@@ -27,6 +29,9 @@ class DataMapRecord(object):
 
 
 class MetadataTable(Table):
+    __slots__ = ["data_maps"]
+    record_lists = ("data_maps",)
+
     def __init__(self, *args):
         super().__init__(*args)
         (_, _, _, data_maps_count) = meta_h_s.unpack(self.data.read(16))
@@ -1,16 +1,15 @@
+from ..utils import pack_array, unpack_array
 from .utils import Table
-import struct
 
 
 class ControlValueProgramTable(Table):
+    __slots__ = ["control_value_program"]
+    record_lists = ("control_value_program",)
+
     def __init__(self, *args):
         super().__init__(*args)
-        n = len(self.data.read())
-        self.data.seek(0)
-        self.control_value_program = struct.unpack(f"{n}B", self.data.read())
+        self.control_value_program = unpack_array(self.data.read(), "u1")
         del self.data
 
     def pack(self):
-        return struct.pack(
-            f"{len(self.control_value_program)}B", *self.control_value_program
-        )
+        return pack_array(self.control_value_program, "u1")
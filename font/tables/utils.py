@@ -1,35 +1,235 @@
+from .. import instrument
+from ..utils import calc_checksum
+import pickle
 import struct
 
 s_bit_line_metrics_s = struct.Struct("2bB9b")
 
+# attributes that do not change the contents of a table
+UNTRACKED_ATTRIBUTES = {
+    "parent",
+    "raw",
+    "raw_checksum",
+    "_checksum",
+    "_changed",
+    "_snapshot",
+}
+
+
+def freeze(value):
+    """Convert records, and lists of them, to comparable tuples of their values."""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+
+    if hasattr(value, "tobytes"):
+        # arrays, which are compared by their contents
+        return type(value), value.tobytes()
+
+    if hasattr(value, "__dict__") or hasattr(value, "__slots__"):
+        names = getattr(value, "__slots__", None) or sorted(vars(value))
+        # the names are given by the type, so only the values are kept
+        return (type(value),) + tuple(
+            freeze(getattr(value, name, None)) for name in names
+        )
+
+    return value
+
+
+class Reader(object):
+    """Read-only file-like object over a buffer.
+
+    Unlike `io.BytesIO` the buffer is never copied: reads return `memoryview`
+    slices of it, so tables can be backed directly by a memory-mapped file.
+    """
+
+    __slots__ = ["_pos", "_view"]
+
+    def __init__(self, data):
+        self._pos = 0
+        self._view = memoryview(data)
+
+    def __len__(self):
+        return len(self._view)
+
+    def getbuffer(self):
+        return self._view
+
+    def read(self, size=-1):
+        start = self._pos
+        if size is None or size < 0:
+            self._pos = len(self._view)
+
+        else:
+            self._pos = min(start + size, len(self._view))
+
+        return self._view[start : self._pos]
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self._pos
+
+        elif whence == 2:
+            offset += len(self._view)
+
+        self._pos = max(offset, 0)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
 
 class Table(object):
-    """Base class for font tables."""
+    """Base class for font tables.
+
+    Tables created by `new_table` keep the data they were read from in `raw`
+    and are written out from it until they are modified. Assigning to any
+    attribute marks a table as modified; records that can be changed in place
+    are compared against a snapshot of their values taken when the table was
+    read, for the attributes named in `record_lists`.
+    """
+
+    __slots__ = [
+        "data",
+        "parent",
+        "raw",
+        "raw_checksum",
+        "tag",
+        "_changed",
+        "_checksum",
+        "_snapshot",
+    ]
+
+    record_lists = ()
 
     def __init__(self, tag, data, parent):
+        self.raw = None
+        self.raw_checksum = None
+        self._checksum = None
+        self._changed = True
+        self._snapshot = None
         self.tag = tag
         self.data = data
         self.parent = parent
         self.data.seek(0)
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name not in UNTRACKED_ATTRIBUTES:
+            object.__setattr__(self, "_changed", True)
+            object.__setattr__(self, "_checksum", None)
+
     def __repr__(self):
         return " ".join(i for i in "<{} Table>".format(self.tag).split() if i != "")
 
     def pack(self):
-        self.data.seek(0)
-        return self.data.read()
+        return self.data.getbuffer()
 
     @property
     def checksum(self):
         """Calculate checksum for this table."""
+        if self.checksum_cached:
+            return self._checksum
+
+        return self.calc_checksum(self.to_bytes())
+
+    @property
+    def checksum_cached(self):
+        """Whether the checksum of the packed table is known.
+
+        It is forgotten when an attribute is assigned to. Tables with record
+        lists can be changed in place without that being noticed, so theirs
+        is never re-used.
+        """
+        return self._checksum is not None and not self.record_lists
+
+    @property
+    def changed(self):
+        """Whether the table may differ from the data it was read from."""
+        if self.raw is None or self._changed:
+            return True
+
+        if not self.record_lists:
+            return False
+
+        if self._snapshot != self.snapshot():
+            # the records are not compared again, and the snapshot is no
+            # longer needed
+            self._changed = True
+            self._snapshot = None
+            return True
+
+        return False
+
+    def snapshot(self):
+        """Return the current contents of the record lists, pickled.
+
+        Different contents never give the same snapshot, and one bytes object
+        takes much less memory to keep than a copy of every record.
+        """
+        return pickle.dumps(
+            freeze([getattr(self, name) for name in self.record_lists]),
+            pickle.HIGHEST_PROTOCOL,
+        )
+
+    def calc_checksum(self, data):
+        """Calculate the checksum of this table's packed data.
+
+        `data` is what `to_bytes` returns. The checksum of the data the table
+        was read from is kept in `raw_checksum`, and that of the packed table
+        while `checksum_cached`, so neither is summed again.
+        """
+        if data is self.raw and self.raw_checksum is not None:
+            return self.raw_checksum
+
+        if data is not self.raw and self.checksum_cached:
+            return self._checksum
+
+        start = instrument.start()
+        value = calc_checksum(data, self.tag)
+        if data is self.raw:
+            self.raw_checksum = value
+
+        else:
+            self._checksum = value
+
+        if start is not None:
+            instrument.emit("checksum", self.tag, start, len(data))
+
+        return value
+
+    def to_bytes(self):
+        """Return the data to write for this table.
+
+        Unmodified tables return the data they were read from, without being
+        packed again.
+        """
+        if not self.changed:
+            return self.raw
+
+        start = instrument.start()
         data = self.pack()
-        while len(data) % 4:
-            data += b"\0"
+        if start is not None:
+            instrument.emit("pack", self.tag, start, None, len(data))
 
-        return sum(struct.unpack(f">{len(data) // 4}I", data)) % 2 ** 32
+        return data
 
 
 class SBitLineMetrics(object):
+    __slots__ = [
+        "ascender",
+        "caret_offset",
+        "caret_slope_denominator",
+        "caret_slope_numerator",
+        "descender",
+        "max_before_bl",
+        "min_advance_sb",
+        "min_after_bl",
+        "min_origin_sb",
+        "pad1",
+        "pad2",
+        "width_max",
+    ]
+
     def __init__(self, data):
         (
             self.ascender,
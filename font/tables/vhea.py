@@ -0,0 +1,17 @@
+from .hhea import HorizontalHeaderTable
+import struct
+
+vhea_version_s = struct.Struct(">I")
+
+
+# same layout as the horizontal header table, with vertical metrics in place of
+# horizontal ones; versions 1.0 and 1.1 only differ in how fields are named
+class VerticalHeaderTable(HorizontalHeaderTable):
+    __slots__ = ["version"]
+
+    def __init__(self, tag, data, parent):
+        (self.version,) = vhea_version_s.unpack(data.read(4))
+        super().__init__(tag, data, parent)
+
+    def pack(self):
+        return vhea_version_s.pack(self.version) + super().pack()[4:]
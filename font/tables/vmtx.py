@@ -0,0 +1,10 @@
+from .hmtx import HorizontalMetricsTable
+
+
+# same layout as the horizontal metrics table, with advance heights and top side
+# bearings, and the number of full metrics given by the vhea table
+class VerticalMetricsTable(HorizontalMetricsTable):
+    __slots__ = ()
+
+    header_tag = "vhea"
+    axis = 1
@@ -0,0 +1,250 @@
+from . import instrument, otf, utils, woff
+import zlib
+
+FORMATS = ("otf", "woff")
+
+
+def read_directory(fp, format):
+    """Read the header and table directory of an OTF or WOFF file.
+
+    Returns a dict of header fields and a list of (tag, offset, comp_length,
+    length, checksum) tuples, one per table; `comp_length` is the number of
+    bytes stored in the file, which equals `length` unless it is compressed.
+    """
+    if format == "otf":
+        sfnt_version, num_tables, *_ = otf.header_s.unpack(fp.read(otf.HEADER_SIZE))
+        header = {"sfnt_version": sfnt_version}
+        entries = []
+        directory = fp.read(num_tables * otf.TABLE_SIZE)
+        for tag, checksum, offset, length in otf.table_s.iter_unpack(directory):
+            entries.append((utils.tag2str(tag), offset, length, length, checksum))
+
+        return header, entries
+
+    (
+        signature,
+        sfnt_version,
+        _,  # length unneeded
+        num_tables,
+        _,  # reserved
+        _,  # total sfnt size unneeded
+        major_version,
+        minor_version,
+        meta_offset,
+        meta_length,
+        meta_orig_length,
+        priv_offset,
+        priv_length,
+    ) = woff.header_s.unpack(fp.read(woff.HEADER_SIZE))
+    if utils.tag2str(signature) != "wOFF":
+        raise Exception(
+            "Invalid file signature; expected: 'wOFF', received: '{}'".format(
+                utils.tag2str(signature)
+            )
+        )
+
+    header = {
+        "sfnt_version": sfnt_version,
+        "major_version": major_version,
+        "minor_version": minor_version,
+        "metadata": (meta_offset, meta_length, meta_orig_length),
+        "privatedata": (priv_offset, priv_length),
+    }
+    entries = []
+    directory = fp.read(num_tables * woff.TABLE_SIZE)
+    for tag, offset, comp, length, checksum in woff.table_s.iter_unpack(directory):
+        if comp > length:
+            raise Exception(
+                "Invalid {} table; compressed length is larger than original".format(
+                    utils.tag2str(tag)
+                )
+            )
+
+        entries.append((utils.tag2str(tag), offset, comp, length, checksum))
+
+    return header, entries
+
+
+def read_table(fp, entry):
+    """Read and, if needed, decompress the data of a table directory entry."""
+    tag, offset, comp, length, _ = entry
+    start = instrument.start()
+    fp.seek(offset)
+    data = fp.read(comp)
+    if start is not None:
+        instrument.emit("read", tag, start, None, len(data))
+
+    if comp < length:
+        start = instrument.start()
+        try:
+            data = zlib.decompress(data)
+
+        except zlib.error:
+            raise Exception("Invalid {} table; failed to decompress".format(tag))
+
+        if start is not None:
+            instrument.emit("decompress", tag, start, comp, len(data))
+
+    if len(data) != length:
+        raise Exception(
+            "Invalid {} table; expected {} bytes, received {}".format(
+                tag, length, len(data)
+            )
+        )
+
+    return data
+
+
+def transcode(src_fp, dst_fp, src_format, dst_format, profile="default"):
+    """Convert a font between the OTF and WOFF formats, one table at a time.
+
+    Tables are copied from `src_fp` to `dst_fp` as they are, decompressing or
+    compressing their data as needed, without being parsed. Only the `head`
+    table is changed, to update its checksum adjustment; the checksums of the
+    other tables are taken from the source directory. At most one table's
+    data is held at a time, except when writing WOFF to a stream that cannot
+    seek, where the compressed tables are kept until the directory is written.
+
+    `profile` selects the WOFF compression settings, as for `WOFF.to_file`.
+    WOFF metadata and private data are kept when converting WOFF to WOFF, and
+    dropped when converting to OTF.
+    """
+    for format in (src_format, dst_format):
+        if format not in FORMATS:
+            raise Exception(
+                "Invalid font format; expected one of: {}, received: '{}'".format(
+                    ", ".join("'{}'".format(name) for name in FORMATS), format
+                )
+            )
+
+    if profile not in woff.PROFILES:
+        raise Exception(
+            "Invalid compression profile; expected one of: {}, received: '{}'".format(
+                ", ".join("'{}'".format(name) for name in woff.PROFILES), profile
+            )
+        )
+
+    header, entries = read_directory(src_fp, src_format)
+    entries.sort(key=lambda entry: utils.str2tag(entry[0]))
+    checksums = [entry[4] for entry in entries]
+
+    head = None
+    head_data = None
+    for i, entry in enumerate(entries):
+        if entry[0] == "head":
+            head = i
+            head_data = bytearray(read_table(src_fp, entry))
+            head_data[8:12] = bytes(4)
+            checksums[i] = utils.calc_checksum(head_data)
+
+    sfnt_directory = otf.pack_directory(
+        header["sfnt_version"],
+        [(entry[0], checksum, entry[3]) for entry, checksum in zip(entries, checksums)],
+    )
+    if head is not None:
+        adjustment = (
+            0xB1B0AFBA - utils.calc_checksum(sfnt_directory) - sum(checksums)
+        ) % 2 ** 32
+        head_data[8:12] = adjustment.to_bytes(4, "big")
+
+    def tables():
+        for i, entry in enumerate(entries):
+            yield head_data if i == head else read_table(src_fp, entry)
+
+    if dst_format == "otf":
+        dst_fp.write(sfnt_directory)
+        for data in tables():
+            dst_fp.write(data)
+            dst_fp.write(b"\0" * utils.calc_padding(len(data)))
+
+    else:
+        write_woff(src_fp, dst_fp, header, entries, checksums, tables(), profile)
+
+
+def write_woff(src_fp, dst_fp, header, entries, checksums, tables, profile):
+    """Compress tables into a WOFF file.
+
+    The header and directory are written last when `dst_fp` can seek, and the
+    compressed tables are kept until then otherwise.
+    """
+    seekable = dst_fp.seekable() if hasattr(dst_fp, "seekable") else False
+    start = dst_fp.tell() if seekable else 0
+    offset = woff.HEADER_SIZE + woff.TABLE_SIZE * len(entries)
+    if seekable:
+        dst_fp.write(b"\0" * offset)
+
+    directory = []
+    table_data = []
+    for entry, checksum, data in zip(entries, checksums, tables):
+        comp, _ = woff.compress(data, profile, entry[0])
+        directory.append(
+            woff.table_s.pack(
+                utils.str2tag(entry[0]), offset, len(comp), len(data), checksum
+            )
+        )
+        offset += len(comp) + utils.calc_padding(len(comp))
+        if seekable:
+            dst_fp.write(comp)
+            dst_fp.write(b"\0" * utils.calc_padding(len(comp)))
+
+        else:
+            table_data.append(comp)
+
+    meta_offset = 0
+    metadata = b""
+    meta_offset_src, meta_length, meta_orig_length = header.get("metadata", (0, 0, 0))
+    if meta_length:
+        # metadata is copied still compressed
+        src_fp.seek(meta_offset_src)
+        metadata = src_fp.read(meta_length)
+        meta_offset = offset
+        offset += meta_length
+
+    priv_offset = priv_padding = 0
+    privatedata = b""
+    priv_offset_src, priv_length = header.get("privatedata", (0, 0))
+    if priv_length:
+        src_fp.seek(priv_offset_src)
+        privatedata = src_fp.read(priv_length)
+        priv_padding = utils.calc_padding(offset)
+        priv_offset = offset + priv_padding
+        offset = priv_offset + priv_length
+
+    file_header = woff.header_s.pack(
+        utils.str2tag("wOFF"),
+        header["sfnt_version"],
+        offset,
+        len(entries),
+        0,
+        otf.HEADER_SIZE
+        + otf.TABLE_SIZE * len(entries)
+        + sum(length + utils.calc_padding(length) for _, _, _, length, _ in entries),
+        header.get("major_version", 0),
+        header.get("minor_version", 0),
+        meta_offset,
+        meta_length,
+        meta_orig_length,
+        priv_offset,
+        priv_length,
+    )
+
+    if seekable:
+        dst_fp.write(metadata)
+        dst_fp.write(b"\0" * priv_padding)
+        dst_fp.write(privatedata)
+        end = dst_fp.tell()
+        dst_fp.seek(start)
+        dst_fp.write(file_header)
+        dst_fp.write(b"".join(directory))
+        dst_fp.seek(end)
+
+    else:
+        dst_fp.write(file_header)
+        dst_fp.write(b"".join(directory))
+        for comp in table_data:
+            dst_fp.write(comp)
+            dst_fp.write(b"\0" * utils.calc_padding(len(comp)))
+
+        dst_fp.write(metadata)
+        dst_fp.write(b"\0" * priv_padding)
+        dst_fp.write(privatedata)
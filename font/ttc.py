@@ -1,5 +1,7 @@
-from . import otf, tables, utils
+from . import otf, tables, utils, woff2
+import hashlib
 import io
+import mmap
 import struct
 
 header_s = struct.Struct(">I2HI")
@@ -12,17 +14,184 @@ TABLE_SIZE = 16
 UINT32_SIZE = 4
 
 
+def read_directory(fp, font_offset, index):
+    """Read the table directory of the font starting at `font_offset`.
+
+    Returns the font's sfnt version, a list of (tag, checksum, offset, length)
+    tuples, one per table, and the (name, range) sections the font covers,
+    keyed so that sections shared with other fonts can be checked once.
+    """
+    fp.seek(font_offset)
+    sfnt_version, num_tables, *_ = otf.header_s.unpack(fp.read(HEADER_SIZE))
+
+    sections = {
+        ("directory", font_offset): (
+            "font {} table directory".format(index),
+            range(font_offset, font_offset + HEADER_SIZE + num_tables * TABLE_SIZE),
+        )
+    }
+    entries = []
+    directory = fp.read(num_tables * TABLE_SIZE)
+    for tag, checksum, offset, length in otf.table_s.iter_unpack(directory):
+        tag = utils.tag2str(tag)
+
+        sections.setdefault(
+            ("table", offset, length),
+            ("font {} '{}' table".format(index, tag), range(offset, offset + length)),
+        )
+        entries.append((tag, checksum, offset, length))
+
+    return sfnt_version, entries, sections
+
+
+def read_fonts(fp, directories, shared, lazy=False, tags=None):
+    """Create the fonts described by a list of (sfnt version, entries) pairs.
+
+    Tables are looked up in, and added to, `shared` by tag, offset and length,
+    so fonts pointing at the same data are given the same table object, whose
+    parent is the first font to use it. The
+    data of tables not already in `shared` is read in a single pass in file
+    order, unless `lazy` is set. If `tags` is given only the tables with those
+    tags are included.
+    """
+    directories = [
+        (
+            sfnt_version,
+            [entry for entry in entries if tags is None or entry[0] in tags],
+        )
+        for sfnt_version, entries in directories
+    ]
+
+    data = {}
+    if not lazy:
+        keys = {
+            (tag, offset, length)
+            for _, entries in directories
+            for tag, _, offset, length in entries
+            if (tag, offset, length) not in shared
+        }
+        data = utils.read_ranges(fp, ((key, key[1], key[2]) for key in keys))
+
+    fonts = []
+    for sfnt_version, entries in directories:
+        otf_f = otf.File()
+        otf_f.sfnt_version = sfnt_version
+        for tag, checksum, offset, length in entries:
+            table = shared.get((tag, offset, length))
+            if table is None:
+                if lazy:
+                    table = tables.LazyTable(tag, fp, offset, length, otf_f, checksum)
+
+                else:
+                    table = tables.new_table(
+                        tag, data[tag, offset, length], otf_f, checksum
+                    )
+
+                shared[tag, offset, length] = table
+
+            otf_f.tables.append(table)
+
+        otf_f.tables.sort(key=lambda table: utils.str2tag(table.tag))
+        fonts.append(otf_f)
+
+    return fonts
+
+
+class LazyFont(object):
+    """Placeholder for a font in a collection that is only read when first used.
+
+    Attribute access is passed on to the font, which is read, along with its
+    table directory, by `load`. Its tables are themselves loaded lazily.
+    """
+
+    __slots__ = ["_args", "_font"]
+
+    def __init__(self, fp, font_offset, index, shared, header_sections, tags):
+        self._args = (fp, font_offset, index, shared, header_sections, tags)
+        self._font = None
+
+    def __contains__(self, tag):
+        return tag in self.load()
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __getitem__(self, tag):
+        return self.load()[tag]
+
+    def __setattr__(self, name, value):
+        if name in LazyFont.__slots__:
+            object.__setattr__(self, name, value)
+
+        else:
+            setattr(self.load(), name, value)
+
+    def __repr__(self):
+        if self._font is None:
+            return "<font {} (unloaded)>".format(self._args[2])
+
+        return repr(self._font)
+
+    @property
+    def loaded(self):
+        """Whether the font has been read yet."""
+        return self._font is not None
+
+    def load(self):
+        """Read the font, if not already done, and return it."""
+        if self._font is None:
+            fp, font_offset, index, shared, header_sections, tags = self._args
+            sfnt_version, entries, sections = read_directory(fp, font_offset, index)
+            utils.validate_ranges(header_sections + list(sections.values()))
+            (self._font,) = read_fonts(
+                fp, [(sfnt_version, entries)], shared, True, tags
+            )
+            self._args = None
+
+        return self._font
+
+
 class File(object):
     def __init__(self):
         self.fonts = []
 
     @classmethod
-    def from_bytes(cls, bytes):
+    def from_bytes(cls, bytes, lazy=False, tags=None):
         """Generate a TTC file from a string of bytes."""
-        return cls.from_file(io.BytesIO(bytes))
+        return cls.from_file(io.BytesIO(bytes), lazy, tags)
+
+    @classmethod
+    def from_path(cls, path, lazy=False, tags=None):
+        """Generate a TTC file by memory-mapping the file at `path`.
+
+        See `otf.File.from_path`; tables shared between fonts are views of the
+        same region of the mapping.
+        """
+        with open(path, "rb") as fp:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return cls.from_file(tables.utils.Reader(data), lazy, tags)
 
     @classmethod
-    def from_file(cls, fp):
+    def open(cls, path):
+        """Open the collection at `path`, reading only its header.
+
+        The file is memory-mapped and each font is read when it is first used,
+        as with `from_path(path, lazy=True)`.
+        """
+        return cls.from_path(path, lazy=True)
+
+    @classmethod
+    def from_file(cls, fp, lazy=False, tags=None):
+        """Generate a TTC file from a file object.
+
+        Fonts that point at the same table data share one table object. The
+        table directories of all fonts are read first, then the table data in
+        a single pass in file order. If `lazy` is set only the collection
+        header is read; each font is read the first time it is used, and its
+        tables the first time they are used, so `fp` must be kept open until
+        then. If `tags` is given only the tables with those tags are read.
+        """
         obj = cls()
         ttc_tag, major_version, minor_version, num_fonts = header_s.unpack(
             fp.read(HEADER_SIZE)
@@ -31,107 +200,139 @@ class File(object):
         for _ in range(num_fonts):
             offset_table.append(uint32.unpack(fp.read(UINT32_SIZE))[0])
 
+        dsig_length = 0
         if major_version == 2:
             dsig_tag, dsig_length, dsig_offset = header_v2_s.unpack(
                 fp.read(HEADER_SIZE)
             )
 
-        obj.fonts = []
-        for font_offset in offset_table:
-            fp.seek(font_offset)
-            otf_f = otf.File()
-            otf_f.sfnt_version, num_tables, *_ = otf.header_s.unpack(
-                fp.read(HEADER_SIZE)
+        header_sections = [("collection header", range(fp.tell()))]
+        if dsig_length:
+            header_sections.append(
+                ("DSIG", range(dsig_offset, dsig_offset + dsig_length))
             )
 
-            ranges = [
-                range(HEADER_SIZE),
-                range(font_offset, font_offset + HEADER_SIZE + num_tables * TABLE_SIZE),
+        shared = {}
+        if lazy:
+            obj.fonts = [
+                LazyFont(fp, font_offset, i, shared, header_sections, tags)
+                for i, font_offset in enumerate(offset_table)
             ]
+            return obj
 
-            for _ in range(num_tables):
-                tag, _, offset, length = otf.table_s.unpack(fp.read(TABLE_SIZE))
-
-                ranges.append(range(offset, offset + length))
+        # tables may be shared between fonts, so identical ranges are only
+        # checked once
+        sections = {}
 
-                start = fp.tell()
-                fp.seek(offset)
-                table = tables.new_table(utils.tag2str(tag), fp.read(length), obj)
-                fp.seek(start)
+        directories = []
+        for i, font_offset in enumerate(offset_table):
+            sfnt_version, entries, font_sections = read_directory(fp, font_offset, i)
+            for key, section in font_sections.items():
+                sections.setdefault(key, section)
 
-                otf_f.tables.append(table)
-
-            otf_f.tables.sort(key=lambda table: utils.str2tag(table.tag))
-            obj.fonts.append(otf_f)
+            directories.append((sfnt_version, entries))
 
+        utils.validate_ranges(header_sections + list(sections.values()))
+        obj.fonts = read_fonts(fp, directories, shared, tags=tags)
         return obj
 
     def to_bytes(self):
         """Convert this file to bytes and re-use any tables possible."""
+        fp = io.BytesIO()
+        self.to_file(fp)
+        return fp.getvalue()
+
+    def to_file(self, fp):
+        """Write this file to a file object and re-use any tables possible.
+
+        The layout of the collection is worked out first, then each table is
+        packed and written in turn, so only one table's data is held at a time.
+        """
         offset = 2 * HEADER_SIZE + len(self.fonts) * UINT32_SIZE
-        header = header_s.pack(utils.str2tag("ttcf"), 2, 0, len(self.fonts))
         font_offsets = []
 
         dsig = None
 
-        data = []
-        used = []
+        layout = []
+        # tables already written, by content; shared tables are stored once
+        used = {}
         for font in self.fonts:
-            font_offsets.append(offset)
-            offset += HEADER_SIZE + len(font.tables) * TABLE_SIZE
-
-            font_data = b""
-            font_table_data = otf.header_s.pack(
-                font.sfnt_version,
-                len(font.tables),
-                *utils.calc_search_range(len(font.tables))
-            )
-
             font.tables.sort(key=lambda table: utils.str2tag(table.tag))
+            font_tables = []
             for table in font.tables:
                 if table.tag == "DSIG":
                     dsig = table
-                    continue
 
-                table_data = table.pack()
-                for prev in used:
-                    if prev[0] == table_data:
-                        font_table_data += otf.table_s.pack(
-                            utils.str2tag(table.tag), table.checksum, *prev[1]
-                        )
-                        break
+                else:
+                    font_tables.append(table)
+
+            font_offsets.append(offset)
+            offset += HEADER_SIZE + len(font_tables) * TABLE_SIZE
+
+            directory = [
+                otf.header_s.pack(
+                    font.sfnt_version,
+                    len(font_tables),
+                    *utils.calc_search_range(len(font_tables))
+                )
+            ]
+            writes = []
+            for table in font_tables:
+                table_data = table.to_bytes()
+                checksum = table.calc_checksum(table_data)
+                key = (len(table_data), checksum, hashlib.sha256(table_data).digest())
+                # the original data of unmodified tables, which they hold
+                # anyway, so they are not compared against it again
+                raw_data = table_data if table_data is table.raw else None
+                prev = used.get(key)
+                prev_data = None
+                if prev is not None:
+                    prev_data = prev[0].to_bytes() if prev[1] is None else prev[1]
+
+                if prev_data is not None and prev_data == table_data:
+                    directory.append(
+                        otf.table_s.pack(utils.str2tag(table.tag), checksum, *prev[2:])
+                    )
 
                 else:
-                    while offset % 4:
-                        font_data += b"\0"
-                        offset += 1
-
-                    font_data += table_data
-                    font_table_data += otf.table_s.pack(
-                        utils.str2tag(table.tag),
-                        table.checksum,
-                        offset,
-                        len(table_data),
+                    padding = utils.calc_padding(offset)
+                    offset += padding
+                    writes.append((padding, table, raw_data))
+                    directory.append(
+                        otf.table_s.pack(
+                            utils.str2tag(table.tag),
+                            checksum,
+                            offset,
+                            len(table_data),
+                        )
                     )
+                    used.setdefault(key, (table, raw_data, offset, len(table_data)))
                     offset += len(table_data)
 
-            data.append(font_table_data + font_data)
+            layout.append((b"".join(directory), writes))
 
-        header += b"".join(uint32.pack(i) for i in font_offsets)
-        data = b"".join(data)
+        dsig_padding = 0
         if dsig is None:
-            header += header_v2_s.pack(0, 0, 0)
+            dsig_header = header_v2_s.pack(0, 0, 0)
 
         else:
-            while offset % 4:
-                data += b"\0"
-                offset += 1
+            dsig_padding = utils.calc_padding(offset)
+            dsig_header = header_v2_s.pack(
+                utils.str2tag("DSIG"), len(dsig.to_bytes()), offset + dsig_padding
+            )
 
-            dsig_data = dsig.pack()
-            header += header_v2_s.pack(utils.str2tag("DSIG"), len(dsig_data), offset)
-            data += dsig_data
+        fp.write(header_s.pack(utils.str2tag("ttcf"), 2, 0, len(self.fonts)))
+        fp.write(b"".join(uint32.pack(i) for i in font_offsets))
+        fp.write(dsig_header)
+        for directory, writes in layout:
+            fp.write(directory)
+            for padding, table, table_data in writes:
+                fp.write(b"\0" * padding)
+                fp.write(table.to_bytes() if table_data is None else table_data)
 
-        return header + data
+        if dsig is not None:
+            fp.write(b"\0" * dsig_padding)
+            fp.write(dsig.to_bytes())
 
     def to_woff(self):
         if len(self.fonts) > 1:
@@ -139,3 +340,10 @@ class File(object):
 
         elif len(self.fonts) == 1:
             return self.fonts[0].to_woff()
+
+    def to_woff2(self):
+        """Generate a WOFF2 collection file object from this TTC file."""
+        woff2_f = woff2.File()
+        woff2_f.sfnt_version = utils.str2tag("ttcf")
+        woff2_f.fonts = self.fonts.copy()
+        return woff2_f
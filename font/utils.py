@@ -1,27 +1,124 @@
-from . import otf
+from . import instrument, otf, ttc
+import array
 import struct
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# array type code for unsigned 32-bit integers
+UINT32_CODE = "I" if array.array("I").itemsize == 4 else "L"
+
+# array type codes for the big-endian NumPy types of bulk table data
+ARRAY_CODES = {
+    "u1": "B",
+    ">u2": "H",
+    ">i2": "h",
+    ">u4": UINT32_CODE,
+    ">i4": "i" if array.array("i").itemsize == 4 else "l",
+}
 
 
 def calc_checksum(data, tag=None):
-    """Calculate the checksum """
-    while len(data) % 4:
-        data += b"\0"
+    """Calculate the checksum of a bytes-like object.
+
+    The data is summed as big-endian uint32s in a single pass, with NumPy if
+    it is installed or otherwise as a byte-swapped `array.array`.
+    """
+    data = memoryview(data).cast("B")
+    end = len(data) - len(data) % 4
+    if numpy is not None:
+        value = int(numpy.frombuffer(data[:end], ">u4").sum(dtype=numpy.uint64))
 
-    if tag == "head":
+    else:
+        words = array.array(UINT32_CODE)
+        words.frombytes(data[:end])
+        if sys.byteorder == "little":
+            words.byteswap()
+
+        value = sum(words)
+
+    if end < len(data):
+        value += int.from_bytes(bytes(data[end:]).ljust(4, b"\0"), "big")
+
+    if tag in ("head", "bhed"):
+        # checksum adjustment is treated as zero
         assert len(data) > 12
-        data = data[:8] + b"\0" * 4 + data[12:]
+        value -= int.from_bytes(data[8:12], "big")
+
+    return value % 2 ** 32
+
+
+def unpack_array(data, dtype):
+    """Return the big-endian values in `data` as a writable array.
+
+    `dtype` is a key of `ARRAY_CODES`. Either way the values are copied once
+    into native byte order: with NumPy into an array of the matching native
+    type, otherwise into an `array.array`. `pack_array` takes either back.
+    """
+    if numpy is not None:
+        dtype = numpy.dtype(dtype)
+        return numpy.frombuffer(data, dtype).astype(dtype.newbyteorder("="))
+
+    values = array.array(ARRAY_CODES[dtype])
+    values.frombytes(data)
+    if sys.byteorder == "little" and values.itemsize > 1:
+        values.byteswap()
+
+    return values
+
+
+def pack_array(values, dtype):
+    """Return a sequence of integers as big-endian data of the type `dtype`.
 
-    return sum(struct.unpack(">{}I".format(len(data) // 4), data)) % 2 ** 32
+    `values` is usually an array returned by `unpack_array`, but any sequence
+    of integers in range is accepted.
+    """
+    if numpy is not None:
+        return numpy.asarray(values, dtype).tobytes()
+
+    values = array.array(ARRAY_CODES[dtype], values)
+    if sys.byteorder == "little" and values.itemsize > 1:
+        values.byteswap()
+
+    return values.tobytes()
+
+
+def unpack_fixed_array(data):
+    """Return the big-endian 16.16 fixed-point numbers in `data` as floats."""
+    values = unpack_array(data, ">i4")
+    if numpy is not None:
+        return values / 65536
+
+    return array.array("d", [value / 65536 for value in values])
+
+
+def pack_fixed_array(values):
+    """Return a sequence of floats as big-endian 16.16 fixed-point data."""
+    if numpy is not None:
+        return numpy.rint(numpy.asarray(values, float) * 65536).astype(">i4").tobytes()
+
+    return pack_array([round(value * 65536) for value in values], ">i4")
 
 
 def calc_checksum_adjustment(file):
     """Calculate checksum adjustment for a font file."""
+    if isinstance(file, ttc.LazyFont):
+        file = file.load()
+
     if not isinstance(file, otf.File):
         file = file.to_otf()
 
     return (0xB1B0AFBA - calc_checksum(file.to_bytes())) % 2 ** 32
 
 
+def calc_padding(length):
+    """Calculate the number of null bytes needed to pad to a 4-byte boundary."""
+    return -length % 4
+
+
 def calc_search_range(num_tables):
     """Calculate the search range, entry selector and range shift for an OTF file."""
     exp = 0
@@ -37,8 +134,73 @@ def calc_search_range(num_tables):
 
 
 def check_range_overlap(ranges):
-    """Check that no ranges cross into other ranges."""
-    return len(set(ranges[0]).intersection(*ranges)) > 0
+    """Check whether any ranges cross into other ranges."""
+    return find_range_overlap(enumerate(ranges)) is not None
+
+
+def find_range_overlap(sections):
+    """Find a pair of overlapping sections of a file.
+
+    `sections` is an iterable of (name, range) pairs. The names of the first
+    overlapping pair found are returned, or None if no sections overlap. Runs
+    in O(n log n) over the number of sections by sorting them on their start
+    and sweeping once, rather than comparing the bytes each one covers.
+    """
+    sections = sorted(
+        (section for section in sections if len(section[1])),
+        key=lambda section: (section[1].start, section[1].stop),
+    )
+    last = None
+    for section in sections:
+        if last is not None and section[1].start < last[1].stop:
+            return last[0], section[0]
+
+        if last is None or section[1].stop > last[1].stop:
+            last = section
+
+    return None
+
+
+def read_ranges(fp, sections, gap=3):
+    """Read several ranges of a file object in a single forward pass.
+
+    `sections` is an iterable of (key, offset, length) tuples. The ranges are
+    read in order of offset, and ranges less than `gap` bytes apart, such as
+    tables separated only by padding, are merged into one read. Returns a dict
+    mapping each key to a view of its data.
+    """
+    sections = sorted(sections, key=lambda section: section[1])
+    data = {}
+    i = 0
+    while i < len(sections):
+        start = sections[i][1]
+        end = start + sections[i][2]
+        j = i + 1
+        while j < len(sections) and sections[j][1] <= end + gap:
+            end = max(end, sections[j][1] + sections[j][2])
+            j += 1
+
+        read_start = instrument.start()
+        fp.seek(start)
+        block = memoryview(fp.read(end - start))
+        if read_start is not None:
+            instrument.emit("read", None, read_start, None, len(block))
+
+        for key, offset, length in sections[i:j]:
+            data[key] = block[offset - start : offset - start + length]
+
+        i = j
+
+    return data
+
+
+def validate_ranges(sections):
+    """Raise an exception if any of the (name, range) pairs overlap."""
+    overlap = find_range_overlap(sections)
+    if overlap is not None:
+        raise Exception(
+            "Invalid file; overlapping sections ({} and {})".format(*overlap)
+        )
 
 
 def str2tag(str):
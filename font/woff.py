@@ -1,6 +1,10 @@
-from . import otf, tables, utils
+from . import instrument, otf, tables, utils
+import collections
+import concurrent.futures
+import hashlib
 import io
 import struct
+import threading
 import zlib
 
 HEADER_SIZE = 44
@@ -10,6 +14,164 @@ header_s = struct.Struct(">3I2HI2H5I")
 table_s = struct.Struct(">5I")
 
 
+# (level, wbits, mem_level, strategy) settings tried for each table; a smaller
+# window never produces smaller output, so wbits is always the maximum of 15
+PROFILES = {
+    "fast": [(1, 15, 8, zlib.Z_DEFAULT_STRATEGY)],
+    "default": [(zlib.Z_DEFAULT_COMPRESSION, 15, 8, zlib.Z_DEFAULT_STRATEGY)],
+    "max": [
+        (level, 15, mem_level, strategy)
+        for level in (6, 9)
+        for mem_level in (8, 9)
+        for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED, zlib.Z_RLE)
+    ],
+}
+
+TableCompression = collections.namedtuple(
+    "TableCompression", ["tag", "profile", "settings", "length", "comp_length"]
+)
+
+
+class CompressionCache(object):
+    """Least recently used cache of compressed table data.
+
+    Entries are keyed by a hash of the table data and the compression settings
+    tried, so identical tables in different fonts are only compressed once.
+    At most `max_size` bytes of compressed data are kept. The cache is safe to
+    use from several threads at once.
+    """
+
+    __slots__ = ["hits", "max_size", "misses", "size", "_entries", "_lock"]
+
+    def __init__(self, max_size=64 * 2 ** 20):
+        self.hits = 0
+        self.max_size = max_size
+        self.misses = 0
+        self.size = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return "<CompressionCache ({} entries, {} bytes, {:.1%} hit rate)>".format(
+            len(self), self.size, self.hit_rate
+        )
+
+    @property
+    def hit_rate(self):
+        """The fraction of lookups that found an entry."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        """Remove every entry and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.size = 0
+
+    def get(self, key):
+        """Return the (data, settings) stored for `key`, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def key(self, data, profile):
+        """Return the key for data compressed with a profile's settings."""
+        return hashlib.sha256(data).digest(), tuple(PROFILES[profile])
+
+    def put(self, key, value):
+        """Store (data, settings) for `key`, evicting old entries if needed."""
+        size = len(value[0])
+        if size > self.max_size:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return
+
+            self._entries[key] = value
+            self.size += size
+            while self.size > self.max_size:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+# shared by every encode once enabled with `enable_compression_cache`
+compression_cache = None
+
+
+def enable_compression_cache(max_size=64 * 2 ** 20):
+    """Start caching compressed tables for every WOFF file written.
+
+    Returns the new `CompressionCache`, whose statistics can be inspected.
+    """
+    global compression_cache
+    compression_cache = CompressionCache(max_size)
+    return compression_cache
+
+
+def disable_compression_cache():
+    """Stop caching compressed tables, discarding any that were cached."""
+    global compression_cache
+    compression_cache = None
+
+
+def deflate(data, profile="default"):
+    """Compress data with each of the profile's settings.
+
+    Returns the smallest result and the settings that produced it.
+    """
+    best = None
+    for settings in PROFILES[profile]:
+        level, wbits, mem_level, strategy = settings
+        compressor = zlib.compressobj(level, zlib.DEFLATED, wbits, mem_level, strategy)
+        comp = compressor.compress(data) + compressor.flush()
+        if best is None or len(comp) < len(best[0]):
+            best = comp, settings
+
+    return best
+
+
+def compress(data, profile="default", tag=None):
+    """Compress table data, leaving it as is if compression does not help.
+
+    Returns the data to store and the settings used, which are None if the
+    data was left uncompressed. Results are reused from the compression cache
+    when it is enabled. `tag` names the table in instrumentation events.
+    """
+    start = instrument.start()
+    cache = compression_cache
+    if cache is not None:
+        key = cache.key(data, profile)
+        value = cache.get(key)
+        if value is not None:
+            if start is not None:
+                instrument.emit("compress", tag, start, len(data), len(value[0]))
+
+            return value
+
+    comp, settings = deflate(data, profile)
+    if len(comp) >= len(data):
+        # do not compress if doing so increases the size of the data or has not effect
+        comp, settings = data, None
+
+    if cache is not None:
+        cache.put(key, (bytes(comp), settings))
+
+    if start is not None:
+        instrument.emit("compress", tag, start, len(data), len(comp))
+
+    return comp, settings
+
+
 class File(object):
     """Web Open Font Format 1.0 file."""
 
@@ -32,16 +194,19 @@ class File(object):
         self.tables = []
 
     @classmethod
-    def from_bytes(cls, bytes):
+    def from_bytes(cls, bytes, tags=None):
         """Generate a WOFF file from a string of bytes."""
         fp = io.BytesIO(bytes)
-        return cls.from_file(fp)
+        return cls.from_file(fp, tags)
 
     @classmethod
-    def from_file(cls, fp):
-        """Generate a WOFF file from a file object."""
-        file_length = len(fp.read())
-        fp.seek(0)
+    def from_file(cls, fp, tags=None):
+        """Generate a WOFF file from a file object.
+
+        The table directory is read first, then the table data, metadata and
+        private data in a single pass in file order. If `tags` is given only
+        the tables with those tags are read.
+        """
         obj = cls()
         (
             signature,
@@ -80,42 +245,59 @@ class File(object):
             )
 
         ranges = [
-            range(HEADER_SIZE),
-            range(HEADER_SIZE, HEADER_SIZE + num_tables * TABLE_SIZE),
+            ("header", range(HEADER_SIZE)),
+            (
+                "table directory",
+                range(HEADER_SIZE, HEADER_SIZE + num_tables * TABLE_SIZE),
+            ),
         ]
+        entries = []
+        directory = fp.read(num_tables * TABLE_SIZE)
+        for tag, offset, comp, length, checksum in table_s.iter_unpack(directory):
+            tag = utils.tag2str(tag)
+            ranges.append(("'{}' table".format(tag), range(offset, offset + comp)))
+            if comp > length:
+                raise Exception(
+                    "Invalid {} table; compressed length is larger than original".format(
+                        tag
+                    )
+                )
 
-        for _ in range(num_tables):
-            tag, offset, comp, length, _ = table_s.unpack(fp.read(TABLE_SIZE))
+            if tags is None or tag in tags:
+                entries.append((tag, offset, comp, length, checksum))
 
-            ranges.append(range(offset, offset + comp))
+        sections = [(i, entry[1], entry[2]) for i, entry in enumerate(entries)]
+        if meta_length:
+            sections.append(("metadata", meta_offset, meta_length))
 
-            start = fp.tell()
-            fp.seek(offset)
+        if priv_length:
+            ranges.append(
+                ("private data", range(priv_offset, priv_offset + priv_length))
+            )
+            sections.append(("private data", priv_offset, priv_length))
 
+        data = utils.read_ranges(fp, sections)
+
+        for i, (tag, _, comp, length, checksum) in enumerate(entries):
             if comp == length:
                 # data left uncompressed
-                table = tables.new_table(utils.tag2str(tag), fp.read(length), obj)
+                table = tables.new_table(tag, data[i], obj, checksum)
 
-            elif comp < length:
+            else:
                 # decompress data
+                start = instrument.start()
                 try:
-                    table = tables.new_table(
-                        utils.tag2str(tag), zlib.decompress(fp.read(comp)), obj
-                    )
+                    table_data = zlib.decompress(data[i])
 
                 except zlib.error:
                     raise Exception(
-                        "Invalid {} table; failed to decompress".format(
-                            utils.tag2str(tag)
-                        )
+                        "Invalid {} table; failed to decompress".format(tag)
                     )
 
-            else:
-                raise Exception(
-                    "Invalid {} table; compressed length is larger than original".format(
-                        utils.tag2str(tag)
-                    )
-                )
+                if start is not None:
+                    instrument.emit("decompress", tag, start, comp, len(table_data))
+
+                table = tables.new_table(tag, table_data, obj, checksum)
 
             obj.tables.append(table)
 
@@ -123,91 +305,138 @@ class File(object):
 
         obj.metadata = b""
         if meta_length:
-            fp.seek(meta_offset)
             try:
-                obj.metadata = zlib.decompress(fp.read(meta_length))
+                obj.metadata = zlib.decompress(data["metadata"])
                 if len(obj.metadata) != meta_orig_length:
                     # invalid metadata section
                     obj.metadata = b""
 
                 else:
-                    ranges.append(range(meta_offset, meta_offset + meta_length))
+                    ranges.append(
+                        ("metadata", range(meta_offset, meta_offset + meta_length))
+                    )
 
             except zlib.error:
                 obj.metadata = b""
 
         obj.privatedata = b""
         if priv_length:
-            fp.seek(priv_offset)
-            obj.privatedata = fp.read(priv_length)
-            ranges.append(range(priv_offset, priv_offset + priv_length))
+            obj.privatedata = bytes(data["private data"])
 
-        if utils.check_range_overlap(ranges):
-            raise Exception("Invalid file; overlapping sections")
+        utils.validate_ranges(ranges)
 
         return obj
 
-    def to_bytes(self):
+    def to_bytes(self, workers=None, executor=None, profile="default"):
         """Returns a newly constructed bytes representation of the file."""
+        fp = io.BytesIO()
+        self.to_file(fp, workers, executor, profile)
+        return fp.getvalue()
+
+    def to_file(self, fp, workers=None, executor=None, profile="default"):
+        """Write this file to a file object.
+
+        Each table is packed exactly once. The sfnt size and the head table's
+        checksum adjustment are derived from the packed lengths and checksums
+        instead of serializing the equivalent OTF file. Tables are compressed
+        first so the directory can be written up front; only the compressed
+        data is kept until it is written.
+
+        Tables can be compressed in parallel by passing the number of threads
+        to use as `workers`, or an existing `concurrent.futures.Executor` as
+        `executor`. The output is identical to compressing them one by one, but
+        the packed data of every table may be held at once while in flight.
+
+        `profile` selects the compression settings from `PROFILES`: "fast"
+        for on-the-fly encoding, "default", or "max" which tries several
+        settings per table and keeps the smallest result. A `TableCompression`
+        record is returned for each table.
+        """
+        if profile not in PROFILES:
+            raise Exception(
+                "Invalid compression profile; expected one of: {}, received: '{}'".format(
+                    ", ".join("'{}'".format(name) for name in PROFILES), profile
+                )
+            )
+
+        if executor is None and workers is not None and workers > 1:
+            with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+                return self.to_file(fp, executor=executor, profile=profile)
+
         self.tables.sort(key=lambda table: utils.str2tag(table.tag))
-        tables = b""
-        data = b""
-        offset = HEADER_SIZE + (TABLE_SIZE * len(self.tables))
-        for table in self.tables:
+        entries = []
+        table_data = []
+        head = None
+        for i, table in enumerate(self.tables):
             if table.tag == "head":
                 table.checksum_adjustment = 0
-                table.checksum_adjustment = utils.calc_checksum_adjustment(self)
+                head = i
 
-            table_data = table.pack()
+            data = table.to_bytes()
+            entries.append((table.tag, table.calc_checksum(data), len(data)))
+            if i == head:
+                table_data.append(data)
 
-            orig_length = len(table_data)
-            comp = zlib.compress(table_data)
-            if len(comp) >= orig_length:
-                # do not compress if doing so increases the size of the data or has not effect
-                comp = table_data
+            elif executor is None:
+                table_data.append(compress(data, profile, table.tag))
 
-            data += comp
-
-            tables += table_s.pack(
-                utils.str2tag(table.tag),
-                offset,
-                len(comp),
-                orig_length,
-                table.checksum,
+            else:
+                # zlib releases the GIL, so threads compress concurrently
+                table_data.append(executor.submit(compress, data, profile, table.tag))
+
+        if executor is not None:
+            table_data = [
+                comp if i == head else comp.result()
+                for i, comp in enumerate(table_data)
+            ]
+
+        sfnt_directory = otf.pack_directory(self.sfnt_version, entries)
+        if head is not None:
+            table = self.tables[head]
+            table.checksum_adjustment = (
+                0xB1B0AFBA
+                - utils.calc_checksum(sfnt_directory)
+                - sum(checksum for _, checksum, _ in entries)
+            ) % 2 ** 32
+            table_data[head] = compress(table.to_bytes(), profile, "head")
+
+        directory = []
+        report = []
+        offset = HEADER_SIZE + (TABLE_SIZE * len(self.tables))
+        for (tag, checksum, orig_length), (comp, settings) in zip(entries, table_data):
+            report.append(
+                TableCompression(tag, profile, settings, orig_length, len(comp))
+            )
+            directory.append(
+                table_s.pack(
+                    utils.str2tag(tag), offset, len(comp), orig_length, checksum
+                )
             )
 
-            offset += len(comp)
-            while offset % 4:
-                offset += 1
-                data += b"\0"
-
-        data = tables + data
+            offset += len(comp) + utils.calc_padding(len(comp))
 
-        meta_offset = meta_orig_length = meta_length = 0
+        meta_offset = meta_length = 0
         if self.metadata:
             meta_offset = offset
-            comp = zlib.compress(self.metadata)
-            meta_length = len(comp)
-            data += comp
+            metadata, _ = deflate(self.metadata, profile)
+            meta_length = len(metadata)
             offset += meta_length
 
-        priv_offset = priv_length = 0
+        priv_offset = priv_padding = 0
         if self.privatedata:
-            while offset % 4:
-                offset += 1
-                data += b"\0"
-
-            priv_offset = offset
-            data += self.privatedata
+            priv_padding = utils.calc_padding(offset)
+            priv_offset = offset + priv_padding
+            offset = priv_offset + len(self.privatedata)
 
-        return (
+        fp.write(
             header_s.pack(
                 utils.str2tag("wOFF"),
                 self.sfnt_version,
-                len(data) + 44,
+                offset,
                 len(self.tables),
                 0,
-                len(self.to_otf().to_bytes()),
+                len(sfnt_directory)
+                + sum(length + utils.calc_padding(length) for _, _, length in entries),
                 self.major_version,
                 self.minor_version,
                 meta_offset,
@@ -216,8 +445,20 @@ class File(object):
                 priv_offset,
                 len(self.privatedata),
             )
-            + data
         )
+        fp.write(b"".join(directory))
+        for comp, _ in table_data:
+            fp.write(comp)
+            fp.write(b"\0" * utils.calc_padding(len(comp)))
+
+        if self.metadata:
+            fp.write(metadata)
+
+        if self.privatedata:
+            fp.write(b"\0" * priv_padding)
+            fp.write(self.privatedata)
+
+        return report
 
     def to_otf(self):
         """Generate an OTF file object from this WOFF file."""
@@ -0,0 +1,1221 @@
+from . import otf, tables, ttc, utils
+import hashlib
+import io
+import struct
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+HEADER_SIZE = 48
+
+header_s = struct.Struct(">3I2H2I2H5I")
+glyf_h_s = struct.Struct(">4H7I")
+glyph_h_s = struct.Struct(">5h")
+bbox_s = struct.Struct(">4h")
+int16 = struct.Struct(">h")
+uint16 = struct.Struct(">H")
+uint32 = struct.Struct(">I")
+
+# tags with a known index in the table directory flags; index 63 is followed
+# by an explicit tag
+# fmt: off
+KNOWN_TAGS = [
+    "cmap", "head", "hhea", "hmtx", "maxp", "name", "OS/2", "post",
+    "cvt ", "fpgm", "glyf", "loca", "prep", "CFF ", "VORG", "EBDT",
+    "EBLC", "gasp", "hdmx", "kern", "LTSH", "PCLT", "VDMX", "vhea",
+    "vmtx", "BASE", "GDEF", "GPOS", "GSUB", "EBSC", "JSTF", "MATH",
+    "CBDT", "CBLC", "COLR", "CPAL", "SVG ", "sbix", "acnt", "avar",
+    "bdat", "bloc", "bsln", "cvar", "fdsc", "feat", "fmtx", "fvar",
+    "gvar", "hsty", "just", "lcar", "mort", "morx", "opbd", "prop",
+    "trak", "Zapf", "Silf", "Glat", "Gloc", "Feat", "Sill",
+]
+# fmt: on
+KNOWN_TAG_INDEX = {tag: i for i, tag in enumerate(KNOWN_TAGS)}
+ARBITRARY_TAG = 63
+
+# transform versions; for glyf and loca version 0 is the glyph transform and 3
+# is the null transform, for every other table version 0 is the null transform
+NULL_TRANSFORM = 0
+GLYF_TRANSFORM = 0
+GLYF_NULL_TRANSFORM = 3
+HMTX_TRANSFORM = 1
+
+# simple glyph flags
+ON_CURVE = 0x01
+X_SHORT = 0x02
+Y_SHORT = 0x04
+REPEAT = 0x08
+X_SAME_OR_POSITIVE = 0x10
+Y_SAME_OR_POSITIVE = 0x20
+OVERLAP_SIMPLE = 0x40
+
+# composite glyph flags
+ARG_1_AND_2_ARE_WORDS = 0x0001
+WE_HAVE_A_SCALE = 0x0008
+MORE_COMPONENTS = 0x0020
+WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+WE_HAVE_A_TWO_BY_TWO = 0x0080
+WE_HAVE_INSTRUCTIONS = 0x0100
+
+# bit 11 of the head table flags marks fonts altered by a lossless transform
+HEAD_FLAG_TRANSFORMED = 1 << 11
+
+
+class Codec(object):
+    """Compression used for the font data of WOFF2 files.
+
+    WOFF2 requires Brotli; subclasses wrap a Brotli implementation.
+    """
+
+    def compress(self, data):
+        raise NotImplementedError
+
+    def decompress(self, data):
+        raise NotImplementedError
+
+
+class BrotliCodec(Codec):
+    """Codec backed by the `brotli` module."""
+
+    def __init__(self, quality=11):
+        if brotli is None:
+            raise Exception(
+                "The brotli module is required for WOFF2 compression; install it or pass another codec"
+            )
+
+        self.quality = quality
+
+    def compress(self, data):
+        return brotli.compress(bytes(data), brotli.MODE_FONT, self.quality)
+
+    def decompress(self, data):
+        return brotli.decompress(bytes(data))
+
+
+class StoredCodec(Codec):
+    """Stand-in codec for environments without Brotli.
+
+    Data is written as a valid Brotli stream made only of uncompressed
+    meta-blocks, so any WOFF2 decoder can read it. Only such streams can be
+    decompressed.
+    """
+
+    BLOCK_SIZE = 1 << 16
+
+    def compress(self, data):
+        data = memoryview(data)
+        out = bytearray()
+        # a single zero bit selects a 64 KiB window
+        bits, count = 0, 1
+        for start in range(0, len(data), self.BLOCK_SIZE):
+            block = data[start : start + self.BLOCK_SIZE]
+            # ISLAST = 0, MNIBBLES = 4, MLEN - 1, ISUNCOMPRESSED = 1
+            bits |= ((len(block) - 1) << 3 | 1 << 19) << count
+            count += 20
+            out += bits.to_bytes((count + 7) // 8, "little")
+            out += block
+            bits, count = 0, 0
+
+        # ISLAST = 1, ISLASTEMPTY = 1
+        bits |= 0b11 << count
+        count += 2
+        out += bits.to_bytes((count + 7) // 8, "little")
+        return bytes(out)
+
+    def decompress(self, data):
+        data = memoryview(data)
+        out = bytearray()
+        pos = 0
+
+        def read(n):
+            nonlocal pos
+            value = int.from_bytes(data[pos // 8 : (pos + n + 7) // 8 + 1], "little")
+            pos += n
+            return (value >> (pos - n) % 8) & ((1 << n) - 1)
+
+        if read(1) and not read(3) and read(3) == 1:
+            raise Exception("Invalid Brotli stream; large window sizes are unsupported")
+
+        while True:
+            is_last = read(1)
+            if is_last and read(1):
+                # ISLASTEMPTY
+                break
+
+            nibbles = read(2)
+            if nibbles == 3:
+                # metadata meta-block
+                if read(1):
+                    raise Exception("Invalid Brotli stream; reserved bit set")
+
+                skip_bytes = read(2)
+                skip = read(8 * skip_bytes) + 1 if skip_bytes else 0
+                pos = (pos + 7) // 8 * 8 + 8 * skip
+
+            else:
+                length = read(4 * (nibbles + 4)) + 1
+                if is_last or not read(1):
+                    raise Exception(
+                        "Compressed Brotli meta-blocks require the brotli module"
+                    )
+
+                pos = (pos + 7) // 8 * 8
+                out += data[pos // 8 : pos // 8 + length]
+                pos += 8 * length
+
+            if is_last:
+                break
+
+        return bytes(out)
+
+
+def read_base128(fp):
+    """Read a UIntBase128 value from a file object."""
+    value = 0
+    for i in range(5):
+        byte = fp.read(1)[0]
+        if i == 0 and byte == 0x80:
+            raise Exception("Invalid UIntBase128 value; leading zeros")
+
+        if value & 0xFE000000:
+            raise Exception("Invalid UIntBase128 value; exceeds 32 bits")
+
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value
+
+    raise Exception("Invalid UIntBase128 value; exceeds 5 bytes")
+
+
+def pack_base128(value):
+    """Encode a value as a UIntBase128."""
+    data = [value & 0x7F]
+    value >>= 7
+    while value:
+        data.append(0x80 | (value & 0x7F))
+        value >>= 7
+
+    return bytes(reversed(data))
+
+
+def read_255_uint16(fp):
+    """Read a 255UInt16 value from a file object."""
+    code = fp.read(1)[0]
+    if code == 253:
+        return uint16.unpack(fp.read(2))[0]
+
+    if code == 254:
+        return fp.read(1)[0] + 506
+
+    if code == 255:
+        return fp.read(1)[0] + 253
+
+    return code
+
+
+def unpack_255_uint16(data, pos):
+    """Read a 255UInt16 value from a buffer, returning it and the next position."""
+    code = data[pos]
+    if code == 253:
+        return uint16.unpack_from(data, pos + 1)[0], pos + 3
+
+    if code == 254:
+        return data[pos + 1] + 506, pos + 2
+
+    if code == 255:
+        return data[pos + 1] + 253, pos + 2
+
+    return code, pos + 1
+
+
+def pack_255_uint16(value):
+    """Encode a value as a 255UInt16."""
+    if value < 253:
+        return bytes([value])
+
+    if value < 506:
+        return bytes([255, value - 253])
+
+    if value < 762:
+        return bytes([254, value - 506])
+
+    return b"\xfd" + uint16.pack(value)
+
+
+def encode_triplet(on_curve, dx, dy):
+    """Encode a point delta as a flag and its glyph stream bytes."""
+    flag = 0 if on_curve else 128
+    abs_x = abs(dx)
+    abs_y = abs(dy)
+    x_sign = 0 if dx < 0 else 1
+    y_sign = 0 if dy < 0 else 1
+    xy_signs = x_sign + 2 * y_sign
+
+    if dx == 0 and abs_y < 1280:
+        return flag + ((abs_y & 0xF00) >> 7) + y_sign, bytes([abs_y & 0xFF])
+
+    if dy == 0 and abs_x < 1280:
+        return flag + 10 + ((abs_x & 0xF00) >> 7) + x_sign, bytes([abs_x & 0xFF])
+
+    if abs_x < 65 and abs_y < 65:
+        return (
+            flag + 20 + ((abs_x - 1) & 0x30) + (((abs_y - 1) & 0x30) >> 2) + xy_signs,
+            bytes([((abs_x - 1) & 0xF) << 4 | ((abs_y - 1) & 0xF)]),
+        )
+
+    if abs_x < 769 and abs_y < 769:
+        return (
+            flag
+            + 84
+            + 12 * (((abs_x - 1) & 0x300) >> 8)
+            + (((abs_y - 1) & 0x300) >> 6)
+            + xy_signs,
+            bytes([(abs_x - 1) & 0xFF, (abs_y - 1) & 0xFF]),
+        )
+
+    if abs_x < 4096 and abs_y < 4096:
+        return (
+            flag + 120 + xy_signs,
+            bytes([abs_x >> 4, (abs_x & 0xF) << 4 | abs_y >> 8, abs_y & 0xFF]),
+        )
+
+    return (
+        flag + 124 + xy_signs,
+        bytes([abs_x >> 8, abs_x & 0xFF, abs_y >> 8, abs_y & 0xFF]),
+    )
+
+
+def decode_triplet(flag, data, pos):
+    """Decode a point delta, returning on_curve, dx, dy and the next position."""
+    on_curve = not flag & 0x80
+    flag &= 0x7F
+    if flag < 10:
+        dx = 0
+        dy = ((flag & 14) << 7) + data[pos]
+        pos += 1
+
+    elif flag < 20:
+        dx = (((flag - 10) & 14) << 7) + data[pos]
+        dy = 0
+        pos += 1
+
+    elif flag < 84:
+        b0 = flag - 20
+        b1 = data[pos]
+        dx = 1 + (b0 & 0x30) + (b1 >> 4)
+        dy = 1 + ((b0 & 0x0C) << 2) + (b1 & 0x0F)
+        pos += 1
+
+    elif flag < 120:
+        b0 = flag - 84
+        dx = 1 + ((b0 // 12) << 8) + data[pos]
+        dy = 1 + (((b0 % 12) >> 2) << 8) + data[pos + 1]
+        pos += 2
+
+    elif flag < 124:
+        b1 = data[pos + 1]
+        dx = (data[pos] << 4) + (b1 >> 4)
+        dy = ((b1 & 0x0F) << 8) + data[pos + 2]
+        pos += 3
+
+    else:
+        dx = (data[pos] << 8) + data[pos + 1]
+        dy = (data[pos + 2] << 8) + data[pos + 3]
+        pos += 4
+
+    if flag < 10:
+        dy = dy if flag & 1 else -dy
+
+    elif flag < 20:
+        dx = dx if flag & 1 else -dx
+
+    else:
+        dx = dx if flag & 1 else -dx
+        dy = dy if flag & 2 else -dy
+
+    return on_curve, dx, dy, pos
+
+
+def composite_size(data, pos):
+    """Return the size of the composite glyph components starting at `pos`, and
+    whether they are followed by instructions."""
+    start = pos
+    instructions = False
+    while True:
+        flags = uint16.unpack_from(data, pos)[0]
+        pos += 8 if flags & ARG_1_AND_2_ARE_WORDS else 6
+        if flags & WE_HAVE_A_SCALE:
+            pos += 2
+
+        elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+            pos += 4
+
+        elif flags & WE_HAVE_A_TWO_BY_TWO:
+            pos += 8
+
+        instructions |= bool(flags & WE_HAVE_INSTRUCTIONS)
+        if not flags & MORE_COMPONENTS:
+            return pos - start, instructions
+
+
+def unpack_loca(loca, index_format):
+    """Return the glyph offsets from a loca table."""
+    if index_format:
+        return struct.unpack(">{}I".format(len(loca) // 4), loca)
+
+    return [2 * offset for offset in struct.unpack(">{}H".format(len(loca) // 2), loca)]
+
+
+def transform_glyf(glyf, loca, index_format):
+    """Apply the WOFF2 glyf transform.
+
+    Returns the transformed table and the xMin of each glyph, which is needed
+    for the hmtx transform.
+    """
+    glyf = memoryview(glyf)
+    offsets = unpack_loca(loca, index_format)
+    num_glyphs = len(offsets) - 1
+
+    n_contour_stream = bytearray()
+    n_points_stream = bytearray()
+    flag_stream = bytearray()
+    glyph_stream = bytearray()
+    composite_stream = bytearray()
+    bbox_bitmap = bytearray(((num_glyphs + 31) >> 5) << 2)
+    bbox_stream = bytearray()
+    instruction_stream = bytearray()
+    overlap_bitmap = bytearray((num_glyphs + 7) >> 3)
+    x_mins = []
+
+    for i in range(num_glyphs):
+        glyph = glyf[offsets[i] : offsets[i + 1]]
+        if not len(glyph):
+            n_contour_stream += int16.pack(0)
+            x_mins.append(0)
+            continue
+
+        num_contours, x_min, y_min, x_max, y_max = glyph_h_s.unpack_from(glyph)
+        n_contour_stream += int16.pack(num_contours)
+        x_mins.append(x_min)
+
+        if num_contours < 0:
+            size, instructions = composite_size(glyph, 10)
+            composite_stream += glyph[10 : 10 + size]
+            if instructions:
+                pos = 10 + size
+                length = uint16.unpack_from(glyph, pos)[0]
+                glyph_stream += pack_255_uint16(length)
+                instruction_stream += glyph[pos + 2 : pos + 2 + length]
+
+            # composite glyphs always store their bounding box
+            bbox_bitmap[i >> 3] |= 0x80 >> (i & 7)
+            bbox_stream += glyph[2:10]
+            continue
+
+        end_points = struct.unpack_from(">{}H".format(num_contours), glyph, 10)
+        pos = 10 + 2 * num_contours
+        length = uint16.unpack_from(glyph, pos)[0]
+        instructions = glyph[pos + 2 : pos + 2 + length]
+        pos += 2 + length
+
+        last = -1
+        for end in end_points:
+            n_points_stream += pack_255_uint16(end - last)
+            last = end
+
+        num_points = last + 1
+        flags = []
+        while len(flags) < num_points:
+            flag = glyph[pos]
+            pos += 1
+            if flag & REPEAT:
+                flags.extend([flag] * (glyph[pos] + 1))
+                pos += 1
+
+            else:
+                flags.append(flag)
+
+        del flags[num_points:]
+
+        deltas = []
+        for short, same in (
+            (X_SHORT, X_SAME_OR_POSITIVE),
+            (Y_SHORT, Y_SAME_OR_POSITIVE),
+        ):
+            axis = []
+            for flag in flags:
+                if flag & short:
+                    axis.append(glyph[pos] if flag & same else -glyph[pos])
+                    pos += 1
+
+                elif flag & same:
+                    axis.append(0)
+
+                else:
+                    axis.append(int16.unpack_from(glyph, pos)[0])
+                    pos += 2
+
+            deltas.append(axis)
+
+        x = y = 0
+        bbox = None
+        for flag, dx, dy in zip(flags, *deltas):
+            point_flag, data = encode_triplet(flag & ON_CURVE, dx, dy)
+            flag_stream.append(point_flag)
+            glyph_stream += data
+            x += dx
+            y += dy
+            if bbox is None:
+                bbox = [x, y, x, y]
+
+            else:
+                bbox = [
+                    min(bbox[0], x),
+                    min(bbox[1], y),
+                    max(bbox[2], x),
+                    max(bbox[3], y),
+                ]
+
+        glyph_stream += pack_255_uint16(len(instructions))
+        instruction_stream += instructions
+
+        if flags and flags[0] & OVERLAP_SIMPLE:
+            overlap_bitmap[i >> 3] |= 0x80 >> (i & 7)
+
+        if bbox != [x_min, y_min, x_max, y_max]:
+            bbox_bitmap[i >> 3] |= 0x80 >> (i & 7)
+            bbox_stream += glyph[2:10]
+
+    option_flags = 1 if any(overlap_bitmap) else 0
+    streams = [
+        n_contour_stream,
+        n_points_stream,
+        flag_stream,
+        glyph_stream,
+        composite_stream,
+        bbox_bitmap + bbox_stream,
+        instruction_stream,
+    ]
+    return (
+        glyf_h_s.pack(
+            0, option_flags, num_glyphs, index_format, *(len(s) for s in streams)
+        )
+        + b"".join(streams)
+        + (overlap_bitmap if option_flags else b""),
+        x_mins,
+    )
+
+
+def pack_simple_glyph(end_points, instructions, points, bbox, overlap):
+    """Pack a simple glyph from its (on_curve, dx, dy) points."""
+    flags = bytearray()
+    x_data = bytearray()
+    y_data = bytearray()
+    last_flag = None
+    repeat = 0
+    for on_curve, dx, dy in points:
+        flag = ON_CURVE if on_curve else 0
+        if dx == 0:
+            flag |= X_SAME_OR_POSITIVE
+
+        elif -256 < dx < 256:
+            flag |= X_SHORT | (X_SAME_OR_POSITIVE if dx > 0 else 0)
+            x_data.append(abs(dx))
+
+        else:
+            x_data += int16.pack(dx)
+
+        if dy == 0:
+            flag |= Y_SAME_OR_POSITIVE
+
+        elif -256 < dy < 256:
+            flag |= Y_SHORT | (Y_SAME_OR_POSITIVE if dy > 0 else 0)
+            y_data.append(abs(dy))
+
+        else:
+            y_data += int16.pack(dy)
+
+        if overlap and last_flag is None:
+            flag |= OVERLAP_SIMPLE
+
+        if flag == last_flag and repeat < 255:
+            if repeat == 0:
+                flags[-1] |= REPEAT
+                flags.append(1)
+
+            else:
+                flags[-1] += 1
+
+            repeat += 1
+
+        else:
+            flags.append(flag)
+            last_flag = flag
+            repeat = 0
+
+    return b"".join(
+        [
+            glyph_h_s.pack(len(end_points), *bbox),
+            struct.pack(">{}H".format(len(end_points)), *end_points),
+            uint16.pack(len(instructions)),
+            instructions,
+            flags,
+            x_data,
+            y_data,
+        ]
+    )
+
+
+def reconstruct_glyf(data):
+    """Reverse the WOFF2 glyf transform.
+
+    Returns the glyf and loca tables and the xMin of each glyph.
+    """
+    data = memoryview(data)
+    (
+        _,
+        option_flags,
+        num_glyphs,
+        index_format,
+        *sizes,
+    ) = glyf_h_s.unpack_from(data)
+    streams = []
+    offset = glyf_h_s.size
+    for size in sizes:
+        streams.append(data[offset : offset + size])
+        offset += size
+
+    (
+        n_contour_stream,
+        n_points_stream,
+        flag_stream,
+        glyph_stream,
+        composite_stream,
+        bbox_stream,
+        instruction_stream,
+    ) = streams
+    overlap_bitmap = data[offset:] if option_flags & 1 else None
+    bbox_bitmap = bbox_stream[: ((num_glyphs + 31) >> 5) << 2]
+    n_contours = struct.unpack_from(">{}h".format(num_glyphs), n_contour_stream)
+
+    n_points_pos = flag_pos = glyph_pos = composite_pos = instruction_pos = 0
+    bbox_pos = len(bbox_bitmap)
+    glyphs = []
+    x_mins = []
+    for i, num_contours in enumerate(n_contours):
+        explicit_bbox = bbox_bitmap[i >> 3] & (0x80 >> (i & 7))
+        if explicit_bbox:
+            bbox = bbox_s.unpack_from(bbox_stream, bbox_pos)
+            bbox_pos += 8
+
+        if num_contours == 0:
+            if explicit_bbox:
+                raise Exception("Invalid glyf table; empty glyph with bounding box")
+
+            glyphs.append(b"")
+            x_mins.append(0)
+            continue
+
+        if num_contours < 0:
+            if not explicit_bbox:
+                raise Exception(
+                    "Invalid glyf table; composite glyph without bounding box"
+                )
+
+            size, has_instructions = composite_size(composite_stream, composite_pos)
+            glyph = [
+                glyph_h_s.pack(num_contours, *bbox),
+                composite_stream[composite_pos : composite_pos + size],
+            ]
+            composite_pos += size
+            if has_instructions:
+                length, glyph_pos = unpack_255_uint16(glyph_stream, glyph_pos)
+                glyph.append(uint16.pack(length))
+                glyph.append(
+                    instruction_stream[instruction_pos : instruction_pos + length]
+                )
+                instruction_pos += length
+
+            glyphs.append(b"".join(glyph))
+            x_mins.append(bbox[0])
+            continue
+
+        end_points = []
+        last = -1
+        for _ in range(num_contours):
+            count, n_points_pos = unpack_255_uint16(n_points_stream, n_points_pos)
+            last += count
+            end_points.append(last)
+
+        points = []
+        x = y = 0
+        computed = None
+        for flag in flag_stream[flag_pos : flag_pos + last + 1]:
+            on_curve, dx, dy, glyph_pos = decode_triplet(flag, glyph_stream, glyph_pos)
+            points.append((on_curve, dx, dy))
+            x += dx
+            y += dy
+            if computed is None:
+                computed = [x, y, x, y]
+
+            else:
+                computed = [
+                    min(computed[0], x),
+                    min(computed[1], y),
+                    max(computed[2], x),
+                    max(computed[3], y),
+                ]
+
+        flag_pos += last + 1
+        if not explicit_bbox:
+            bbox = computed or [0, 0, 0, 0]
+
+        length, glyph_pos = unpack_255_uint16(glyph_stream, glyph_pos)
+        instructions = instruction_stream[instruction_pos : instruction_pos + length]
+        instruction_pos += length
+
+        overlap = overlap_bitmap is not None and overlap_bitmap[i >> 3] & (
+            0x80 >> (i & 7)
+        )
+        glyphs.append(
+            pack_simple_glyph(end_points, instructions, points, bbox, overlap)
+        )
+        x_mins.append(bbox[0])
+
+    glyf = []
+    offsets = []
+    offset = 0
+    for glyph in glyphs:
+        offsets.append(offset)
+        glyf.append(glyph)
+        # glyphs are kept 4-byte aligned, or 2-byte aligned for short offsets
+        padding = -len(glyph) % (4 if index_format else 2)
+        glyf.append(b"\0" * padding)
+        offset += len(glyph) + padding
+
+    offsets.append(offset)
+    if index_format:
+        loca = struct.pack(">{}I".format(len(offsets)), *offsets)
+
+    else:
+        loca = struct.pack(">{}H".format(len(offsets)), *(i // 2 for i in offsets))
+
+    return b"".join(glyf), loca, x_mins
+
+
+def transform_hmtx(hmtx, num_glyphs, num_h_metrics, x_mins):
+    """Apply the WOFF2 hmtx transform, or return None if it does not apply."""
+    if len(hmtx) != 2 * (num_glyphs + num_h_metrics) or len(x_mins) != num_glyphs:
+        return None
+
+    metrics = struct.unpack_from(">" + "Hh" * num_h_metrics, hmtx)
+    advances = metrics[::2]
+    lsbs = metrics[1::2]
+    extra_lsbs = struct.unpack_from(
+        ">{}h".format(num_glyphs - num_h_metrics), hmtx, 4 * num_h_metrics
+    )
+
+    flags = 0
+    if list(lsbs) == x_mins[:num_h_metrics]:
+        flags |= 1
+
+    if list(extra_lsbs) == x_mins[num_h_metrics:]:
+        flags |= 2
+
+    if not flags:
+        return None
+
+    return b"".join(
+        [
+            bytes([flags]),
+            struct.pack(">{}H".format(num_h_metrics), *advances),
+            b"" if flags & 1 else struct.pack(">{}h".format(num_h_metrics), *lsbs),
+            (
+                b""
+                if flags & 2
+                else struct.pack(">{}h".format(len(extra_lsbs)), *extra_lsbs)
+            ),
+        ]
+    )
+
+
+def reconstruct_hmtx(data, num_glyphs, num_h_metrics, x_mins):
+    """Reverse the WOFF2 hmtx transform."""
+    flags = data[0]
+    pos = 1
+    advances = struct.unpack_from(">{}H".format(num_h_metrics), data, pos)
+    pos += 2 * num_h_metrics
+    if flags & 1:
+        lsbs = x_mins[:num_h_metrics]
+
+    else:
+        lsbs = struct.unpack_from(">{}h".format(num_h_metrics), data, pos)
+        pos += 2 * num_h_metrics
+
+    if flags & 2:
+        extra_lsbs = x_mins[num_h_metrics:num_glyphs]
+
+    else:
+        extra_lsbs = struct.unpack_from(
+            ">{}h".format(num_glyphs - num_h_metrics), data, pos
+        )
+
+    metrics = [value for metric in zip(advances, lsbs) for value in metric]
+    return struct.pack(
+        ">" + "Hh" * num_h_metrics + "{}h".format(len(extra_lsbs)),
+        *metrics,
+        *extra_lsbs
+    )
+
+
+def find_table(font_tables, tag):
+    """Return the table with the given tag from a list of tables, or None."""
+    for table in font_tables:
+        if table.tag == tag:
+            return table
+
+    return None
+
+
+def update_head(sfnt_version, font_tables):
+    """Update the head table of a font whose tables were reconstructed.
+
+    The transform flag is cleared and the checksum adjustment recomputed over
+    the font as it would be written as an OTF file.
+    """
+    head = find_table(font_tables, "head")
+    if head is None:
+        return
+
+    head.flags &= ~HEAD_FLAG_TRANSFORMED
+    entries = []
+    for table in font_tables:
+        data = table.to_bytes()
+        entries.append((table.tag, table.calc_checksum(data), len(data)))
+
+    head.checksum_adjustment = (
+        0xB1B0AFBA
+        - utils.calc_checksum(otf.pack_directory(sfnt_version, entries))
+        - sum(checksum for _, checksum, _ in entries)
+    ) % 2 ** 32
+
+
+def sort_tables(font_tables):
+    """Sort tables by tag, keeping loca directly after glyf."""
+    font_tables = sorted(font_tables, key=lambda table: utils.str2tag(table.tag))
+    loca = find_table(font_tables, "loca")
+    glyf = find_table(font_tables, "glyf")
+    if loca is not None and glyf is not None:
+        font_tables.remove(loca)
+        font_tables.insert(font_tables.index(glyf) + 1, loca)
+
+    return font_tables
+
+
+class File(object):
+    """Web Open Font Format 2.0 file.
+
+    Single fonts keep their tables in `tables`; collections, which have an
+    sfnt version of 'ttcf', keep each font as an `otf.File` in `fonts`.
+    """
+
+    __slots__ = [
+        "fonts",
+        "major_version",
+        "metadata",
+        "minor_version",
+        "privatedata",
+        "sfnt_version",
+        "tables",
+    ]
+
+    def __init__(self):
+        """Generate an empty WOFF2 file."""
+        self.fonts = []
+        self.major_version = 0
+        self.metadata = b""
+        self.minor_version = 0
+        self.privatedata = b""
+        self.sfnt_version = None
+        self.tables = []
+
+    @property
+    def is_collection(self):
+        return self.sfnt_version == utils.str2tag("ttcf")
+
+    @classmethod
+    def from_bytes(cls, bytes, codec=None):
+        """Generate a WOFF2 file from a string of bytes."""
+        return cls.from_file(io.BytesIO(bytes), codec)
+
+    @classmethod
+    def from_file(cls, fp, codec=None):
+        """Generate a WOFF2 file from a file object.
+
+        `codec` is used to decompress the font data; by default the `brotli`
+        module is used.
+        """
+        codec = BrotliCodec() if codec is None else codec
+        obj = cls()
+        (
+            signature,
+            obj.sfnt_version,
+            file_length,
+            num_tables,
+            reserved,
+            total_sfnt_size,
+            total_compressed_size,
+            obj.major_version,
+            obj.minor_version,
+            meta_offset,
+            meta_length,
+            meta_orig_length,
+            priv_offset,
+            priv_length,
+        ) = header_s.unpack(fp.read(HEADER_SIZE))
+        if utils.tag2str(signature) != "wOF2":
+            raise Exception(
+                "Invalid file signature; expected: 'wOF2', received: '{}'".format(
+                    utils.tag2str(signature)
+                )
+            )
+
+        if reserved:
+            raise Exception(
+                "Invalid reserved value in file header; expected: 0x0000, received: {}".format(
+                    "0x" + hex(reserved)[2:].zfill(4)
+                )
+            )
+
+        entries = []
+        for _ in range(num_tables):
+            flags = fp.read(1)[0]
+            if flags & 0x3F == ARBITRARY_TAG:
+                tag = utils.tag2str(uint32.unpack(fp.read(4))[0])
+
+            else:
+                tag = KNOWN_TAGS[flags & 0x3F]
+
+            version = flags >> 6
+            orig_length = read_base128(fp)
+            length = orig_length
+            if tag in ("glyf", "loca"):
+                transformed = version != GLYF_NULL_TRANSFORM
+
+            else:
+                transformed = version != NULL_TRANSFORM
+
+            if transformed:
+                length = read_base128(fp)
+
+            entries.append((tag, version, transformed, orig_length, length))
+
+        font_indices = [list(range(num_tables))]
+        if obj.is_collection:
+            fp.read(4)  # collection version
+            num_fonts = read_255_uint16(fp)
+            font_indices = []
+            for _ in range(num_fonts):
+                font_tables = read_255_uint16(fp)
+                flavor = uint32.unpack(fp.read(4))[0]
+                font_indices.append(
+                    (flavor, [read_255_uint16(fp) for _ in range(font_tables)])
+                )
+
+        data_offset = fp.tell()
+        ranges = [
+            ("header and table directory", range(data_offset)),
+            (
+                "font data",
+                range(data_offset, data_offset + total_compressed_size),
+            ),
+        ]
+        data = memoryview(codec.decompress(fp.read(total_compressed_size)))
+
+        table_data = []
+        offset = 0
+        for _, _, _, _, length in entries:
+            table_data.append(data[offset : offset + length])
+            offset += length
+
+        if offset > len(data):
+            raise Exception("Invalid file; font data is shorter than table directory")
+
+        if obj.is_collection:
+            fonts = []
+            for flavor, indices in font_indices:
+                font = otf.File()
+                font.sfnt_version = flavor
+                fonts.append((font, indices))
+
+        else:
+            fonts = [(obj, font_indices[0])]
+
+        # tables shared between fonts are decoded once
+        decoded = {}
+        glyf_x_mins = {}
+        for font, indices in fonts:
+            tags = {entries[i][0]: i for i in indices}
+            font_tables = {}
+            for i in indices:
+                tag, version, transformed, orig_length, length = entries[i]
+                if i not in decoded and not transformed:
+                    decoded[i] = tables.new_table(tag, table_data[i], font)
+
+                if i in decoded:
+                    font_tables[tag] = decoded[i]
+
+            x_mins = None
+            if "glyf" in tags and entries[tags["glyf"]][2]:
+                glyf, loca = tags["glyf"], tags.get("loca")
+                if loca is None or not entries[loca][2]:
+                    raise Exception("Invalid file; transformed glyf without loca")
+
+                if glyf not in decoded:
+                    glyf_data, loca_data, x_mins = reconstruct_glyf(table_data[glyf])
+                    decoded[glyf] = tables.new_table("glyf", glyf_data, font)
+                    decoded[loca] = tables.new_table("loca", loca_data, font)
+                    glyf_x_mins[glyf] = x_mins
+
+                x_mins = glyf_x_mins[glyf]
+                font_tables["glyf"] = decoded[glyf]
+                font_tables["loca"] = decoded[loca]
+
+            elif "loca" in tags and entries[tags["loca"]][2]:
+                raise Exception("Invalid file; transformed loca without glyf")
+
+            if "hmtx" in tags and entries[tags["hmtx"]][2]:
+                hmtx = tags["hmtx"]
+                if x_mins is None:
+                    raise Exception("Invalid file; transformed hmtx without glyf")
+
+                if entries[hmtx][1] != HMTX_TRANSFORM:
+                    raise Exception("Invalid hmtx table; unknown transform")
+
+                if hmtx not in decoded:
+                    decoded[hmtx] = tables.new_table(
+                        "hmtx",
+                        reconstruct_hmtx(
+                            table_data[hmtx],
+                            font_tables["maxp"].num_glyphs,
+                            font_tables["hhea"].number_of_h_metrics,
+                            x_mins,
+                        ),
+                        font,
+                    )
+
+                font_tables["hmtx"] = decoded[hmtx]
+
+            for tag in tags:
+                if tag not in font_tables:
+                    raise Exception("Invalid {} table; unknown transform".format(tag))
+
+            font.tables = sorted(
+                font_tables.values(), key=lambda table: utils.str2tag(table.tag)
+            )
+            if any(entries[i][2] for i in indices):
+                update_head(font.sfnt_version, font.tables)
+
+        obj.fonts = [font for font, _ in fonts] if obj.is_collection else []
+
+        if meta_length:
+            fp.seek(meta_offset)
+            obj.metadata = codec.decompress(fp.read(meta_length))
+            if len(obj.metadata) != meta_orig_length:
+                # invalid metadata section
+                obj.metadata = b""
+
+            else:
+                ranges.append(
+                    ("metadata", range(meta_offset, meta_offset + meta_length))
+                )
+
+        if priv_length:
+            fp.seek(priv_offset)
+            obj.privatedata = fp.read(priv_length)
+            ranges.append(
+                ("private data", range(priv_offset, priv_offset + priv_length))
+            )
+
+        utils.validate_ranges(ranges)
+        return obj
+
+    def to_bytes(self, codec=None, transform=True):
+        """Returns a newly constructed bytes representation of the file."""
+        fp = io.BytesIO()
+        self.to_file(fp, codec, transform)
+        return fp.getvalue()
+
+    def to_file(self, fp, codec=None, transform=True):
+        """Write this file to a file object.
+
+        `codec` is used to compress the font data; by default the `brotli`
+        module is used. If `transform` is set the glyf, loca and hmtx tables
+        are transformed where possible.
+        """
+        codec = BrotliCodec() if codec is None else codec
+        fonts = self.fonts if self.is_collection else [self]
+
+        directory = []
+        table_data = []
+        font_indices = []
+        total_sfnt_size = 0
+        # tables shared between fonts are stored once
+        stored = {}
+        for font in fonts:
+            font_tables = sort_tables(font.tables)
+            indices = []
+            total_sfnt_size += otf.HEADER_SIZE + len(font_tables) * otf.TABLE_SIZE
+
+            x_mins = None
+            packed = {table.tag: table.to_bytes() for table in font_tables}
+            glyf = packed.get("glyf")
+            loca = packed.get("loca")
+            head = find_table(font_tables, "head")
+            transformed = {}
+            if transform and glyf is not None and loca is not None and head is not None:
+                transformed["glyf"], x_mins = transform_glyf(
+                    glyf, loca, head.index_to_loc_format
+                )
+                transformed["loca"] = b""
+
+            maxp = find_table(font_tables, "maxp")
+            hhea = find_table(font_tables, "hhea")
+            if (
+                x_mins is not None
+                and "hmtx" in packed
+                and maxp is not None
+                and hhea is not None
+            ):
+                hmtx = transform_hmtx(
+                    packed["hmtx"], maxp.num_glyphs, hhea.number_of_h_metrics, x_mins
+                )
+                if hmtx is not None:
+                    transformed["hmtx"] = hmtx
+
+            if transformed and "head" in packed:
+                data = bytearray(packed["head"])
+                data[16:18] = uint16.pack(
+                    uint16.unpack_from(data, 16)[0] | HEAD_FLAG_TRANSFORMED
+                )
+                packed["head"] = bytes(data)
+
+            glyph_key = ()
+            if transformed:
+                # the transforms depend on both the glyf and loca tables
+                glyph_key = (
+                    hashlib.sha256(glyf).digest(),
+                    hashlib.sha256(loca).digest(),
+                )
+
+            for table in font_tables:
+                data = packed[table.tag]
+                key = (table.tag, len(data), hashlib.sha256(data).digest())
+                if table.tag in transformed:
+                    key += glyph_key
+
+                if key not in stored:
+                    stored[key] = len(directory)
+                    total_sfnt_size += len(data) + utils.calc_padding(len(data))
+
+                    flags = KNOWN_TAG_INDEX.get(table.tag, ARBITRARY_TAG)
+                    entry = [bytes([flags])]
+                    if flags == ARBITRARY_TAG:
+                        entry.append(uint32.pack(utils.str2tag(table.tag)))
+
+                    entry.append(pack_base128(len(data)))
+                    if table.tag in transformed:
+                        version = (
+                            HMTX_TRANSFORM if table.tag == "hmtx" else GLYF_TRANSFORM
+                        )
+                        entry[0] = bytes([flags | version << 6])
+                        entry.append(pack_base128(len(transformed[table.tag])))
+                        data = transformed[table.tag]
+
+                    elif table.tag in ("glyf", "loca"):
+                        entry[0] = bytes([flags | GLYF_NULL_TRANSFORM << 6])
+
+                    directory.append(b"".join(entry))
+                    table_data.append(data)
+
+                indices.append(stored[key])
+
+            font_indices.append((font.sfnt_version, indices))
+
+        if self.is_collection:
+            total_sfnt_size += ttc.HEADER_SIZE + len(fonts) * ttc.UINT32_SIZE
+            directory.append(uint32.pack(0x00010000))
+            directory.append(pack_255_uint16(len(fonts)))
+            for flavor, indices in font_indices:
+                directory.append(pack_255_uint16(len(indices)))
+                directory.append(uint32.pack(flavor))
+                directory.extend(pack_255_uint16(i) for i in indices)
+
+        directory = b"".join(directory)
+        data = codec.compress(b"".join(table_data))
+        del table_data
+
+        offset = HEADER_SIZE + len(directory) + len(data)
+        offset += utils.calc_padding(offset)
+
+        meta_offset = meta_length = 0
+        if self.metadata:
+            meta_offset = offset
+            metadata = codec.compress(self.metadata)
+            meta_length = len(metadata)
+            offset += meta_length
+
+        priv_offset = priv_padding = 0
+        if self.privatedata:
+            priv_padding = utils.calc_padding(offset)
+            priv_offset = offset + priv_padding
+            offset = priv_offset + len(self.privatedata)
+
+        fp.write(
+            header_s.pack(
+                utils.str2tag("wOF2"),
+                self.sfnt_version,
+                offset,
+                len(stored),
+                0,
+                total_sfnt_size,
+                len(data),
+                self.major_version,
+                self.minor_version,
+                meta_offset,
+                meta_length,
+                len(self.metadata),
+                priv_offset,
+                len(self.privatedata),
+            )
+        )
+        fp.write(directory)
+        fp.write(data)
+        fp.write(b"\0" * utils.calc_padding(HEADER_SIZE + len(directory) + len(data)))
+        if self.metadata:
+            fp.write(metadata)
+
+        if self.privatedata:
+            fp.write(b"\0" * priv_padding)
+            fp.write(self.privatedata)
+
+    def to_otf(self):
+        """Generate an OTF file object from this WOFF2 file."""
+        if self.is_collection:
+            raise Exception("Font collections must be converted with to_ttc")
+
+        otf_f = otf.File()
+        otf_f.sfnt_version = self.sfnt_version
+        otf_f.tables = self.tables.copy()
+        return otf_f
+
+    def to_ttc(self):
+        """Generate a TTC file object from this WOFF2 collection."""
+        if not self.is_collection:
+            raise Exception("Only font collections can be converted with to_ttc")
+
+        ttc_f = ttc.File()
+        ttc_f.fonts = self.fonts.copy()
+        return ttc_f